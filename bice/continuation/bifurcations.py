@@ -128,14 +128,22 @@ class BifurcationConstraint(Equation):
         # disable the null-space equations
         self.__disabled = True
         Gu = self.group.jacobian(u)
-        if isinstance(Gu, sp.spmatrix):
-            Gu = Gu.toarray()
         self.__disabled = False
         # reference to the indices of the own unknowns
         self_idx = self.group.idx[self]
         # remove those columns/rows of the Jacobian that belong to self,
         # so we are left with the original (unextended) Jacobian
-        return np.delete(np.delete(Gu, self_idx, axis=0), self_idx, axis=1)
+        N = Gu.shape[0]
+        if self_idx.stop == N:
+            # the own unknowns are the last ones, so the original Jacobian is the leading block
+            Gu = Gu[:self_idx.start, :self_idx.start]
+        else:
+            keep = np.r_[0:self_idx.start, self_idx.stop:N]
+            Gu = Gu[keep][:, keep]
+        # convert only the remaining block to a dense matrix
+        if sp.issparse(Gu):
+            Gu = Gu.toarray()
+        return Gu
 
     def actions_before_evaluation(self, u: Array) -> None:
         # TODO: these methods are currently not called from anywhere in the code!
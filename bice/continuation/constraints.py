@@ -8,10 +8,38 @@ import scipy.sparse as sp
 from bice.core.equation import Equation
 from bice.core.types import Array, Shape
 
+# np.trapz was renamed to np.trapezoid in NumPy 2.0
+trapezoid = getattr(np, "trapezoid", getattr(np, "trapz", None))
+
+# cache of the trapezoidal weights of the most recently used grids: {id(x): (x, w)}
+# (the grids are kept in the cache as well, so that their ids cannot be reused)
+_trapz_weights_cache: dict = {}
+
 if TYPE_CHECKING:
     from bice.pde import PartialDifferentialEquation
 
 
+def trapz_weights(x: Array) -> Array:
+    """
+    The weights w of the trapezoidal rule on the (possibly non-uniform) 1d grid x, so that
+    np.trapezoid(u, x) = w.dot(u). The weights of the last few grids are cached, until a grid
+    is replaced (e.g. by mesh adaption). The returned array is read-only.
+    """
+    cached = _trapz_weights_cache.get(id(x))
+    if cached is not None:
+        return cached[1]
+    dx = np.diff(x)
+    w = np.zeros(len(x))
+    w[:-1] += dx / 2
+    w[1:] += dx / 2
+    w.flags.writeable = False
+    # drop the oldest entry if the cache is full
+    if len(_trapz_weights_cache) >= 8:
+        del _trapz_weights_cache[next(iter(_trapz_weights_cache))]
+    _trapz_weights_cache[id(x)] = (x, w)
+    return w
+
+
 class ConstraintEquation(Equation):
     """
     Abstract base class for constraint type equations.
@@ -32,6 +60,15 @@ class ConstraintEquation(Equation):
         # nothing to plot
         pass
 
+    def _ref_u_old(self, eq_idx: slice) -> Array:
+        """
+        The current (old) unknowns of the reference equation in the index range eq_idx of
+        the group, equivalent to self.group.u[eq_idx], but read directly from the reference
+        equation, without assembling the unknowns of the whole group
+        """
+        offset = self.group.idx[self.ref_eq].start
+        return self.ref_eq.u.ravel()[eq_idx.start-offset:eq_idx.stop-offset]
+
 
 class VolumeConstraint(ConstraintEquation):
     """
@@ -72,14 +109,18 @@ class VolumeConstraint(ConstraintEquation):
         if self.fixed_volume is None:
             # calculate the difference in volumes between current
             # and previous unknowns of the reference equation
-            res[self_idx] = np.mean(u[eq_idx] - self.group.u[eq_idx])
+            res[self_idx] = np.mean(u[eq_idx] - self._ref_u_old(eq_idx))
         else:
             # parametric constraint: calculate the difference between current
             # volume and the prescribed fixed_volume parameter
             x = [np.arange(self.ref_eq.shape[-1])]
             if hasattr(self.ref_eq, "x") and getattr(self.ref_eq, "x") is not None:
                 x = getattr(self.ref_eq, "x")
-            res[self_idx] = np.trapz(u[eq_idx], x) - self.fixed_volume
+            if len(x) == 1 and np.size(x[0]) == eq_idx.stop - eq_idx.start:
+                # 1d: the trapezoidal rule is a dot product with (cached) weights
+                res[self_idx] = np.dot(trapz_weights(x[0]), u[eq_idx]) - self.fixed_volume
+            else:
+                res[self_idx] = trapezoid(u[eq_idx], x) - self.fixed_volume
         # Add the constraint to the reference equation: unknown influx is the Langrange multiplier
         res[eq_idx] = u[self_idx]
         return res
@@ -116,6 +157,8 @@ class TranslationConstraint(ConstraintEquation):
 
     def rhs(self, u: Array) -> Array:
         # set up the vector of the residual contributions
+        # NOTE: the result is not a reused buffer, since callers may keep it, e.g. as the
+        #       reference rhs of the finite difference Jacobian
         res = np.zeros((u.size))
         # reference to the equation, shape and indices of the unknowns that we work on
         eq = self.ref_eq
@@ -130,7 +173,7 @@ class TranslationConstraint(ConstraintEquation):
             eq_idx = slice(start, start + var_ndofs)
         # obtain the unknowns
         eq_u = u[eq_idx]
-        eq_u_old = self.group.u[eq_idx]
+        eq_u_old = self._ref_u_old(eq_idx)
         velocity = u[self_idx]
         # add constraint to residuals of reference equation (velocity is the lagrange multiplier)
         try:  # if method du_dx is implemented, use this
@@ -139,7 +182,8 @@ class TranslationConstraint(ConstraintEquation):
         except AttributeError:  # if not, get it from the gradient
             assert eq.x is not None
             eq_dudx = np.gradient(eq_u, eq.x[self.direction])
-        res[eq_idx] = velocity * eq_dudx
+        # (written directly into the zero-initialized result, without a temporary)
+        np.multiply(eq_dudx, velocity, out=res[eq_idx])
         # calculate the difference in center of masses between current
         # and previous unknowns of the reference equation
         # res[self_idx] = np.dot(eq.x[self.direction], eq_u-eq_u_old)
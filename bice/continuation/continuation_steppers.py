@@ -20,6 +20,9 @@ class ContinuationStepper:
     def __init__(self, ds: float = 1e-3) -> None:
         #: continuation step size
         self.ds = ds
+        #: the Jacobian of the problem at the converged solution (u, p) of the last step, if the
+        #: stepper computed it. May be reused, e.g., for the eigenproblem. None otherwise.
+        self.last_jacobian = None
 
     def step(self, problem: 'Problem') -> None:
         """Perform a continuation step on a problem"""
@@ -89,6 +92,7 @@ class PseudoArclengthContinuation(ContinuationStepper):
         p = problem.get_continuation_parameter()
         u = problem.u
         N = u.size
+        self.last_jacobian = None
         # save the old variables
         u_old, p_old = u.copy(), p
         # check if we know at least the two previous continuation points
@@ -132,9 +136,8 @@ class PseudoArclengthContinuation(ContinuationStepper):
         while not converged and count < self.max_newton_iterations:
             # build extended jacobian in (u, parameter)-space
             problem.set_continuation_parameter(p)
-            jac = problem.jacobian(u)
-            if not sp.issparse(jac):
-                jac = sp.coo_matrix(jac)
+            jac_u = problem.jacobian(u)
+            jac = jac_u if sp.issparse(jac_u) else sp.coo_matrix(jac_u)
             # last column of extended jacobian: d(rhs)/d(parameter) - calculate with FD
             problem.set_continuation_parameter(p - self.fd_epsilon)
             rhs_1 = problem.rhs(u)
@@ -166,6 +169,11 @@ class PseudoArclengthContinuation(ContinuationStepper):
             # system converged to new solution, assign the new values
             problem.u = u
             problem.set_continuation_parameter(p)
+            # the Jacobian of the last iteration belongs to the previous iterate, so evaluate it
+            # once more at the accepted solution, if the problem will solve the eigenproblem
+            neigs = problem.settings.neigs
+            if neigs is None or neigs > 0:
+                self.last_jacobian = problem.jacobian(u)
         else:
             # we didn't converge, reset to old values :-/
             problem.u = u_old
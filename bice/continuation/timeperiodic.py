@@ -31,6 +31,8 @@ class TimePeriodicOrbitHandler(Equation):
         # the period is also an unknown, append it to u
         # TODO: a good guess for T is 2pi / Im(lambda), with the unstable eigenvalue lambda
         self.u = np.append(u1, T)
+        #: approximation order of the (central) finite differences for the time derivative
+        self.ddt_order = 8
         # the finite differences matrix to compute the temporal derivative du/dt from given u[t]
         self.ddt = self.build_ddt_matrix()
         # cache for storing the Jacobians J[u, t_i] = d(ref_eq.rhs)/du for each point in time t_i
@@ -60,27 +62,24 @@ class TimePeriodicOrbitHandler(Equation):
         # split the period and reshape to (Nt, *ref_eq.shape)
         return self.u[:-1].reshape((self.Nt, *self.ref_eq.shape))
 
+    def apply_ddt(self, u: Array) -> Array:
+        """
+        Apply the time-derivative operator ddt to the unknowns of each time step u[i],
+        without explicitly using the matrix, i.e., ddt.dot(u) with the periodic stencil
+        """
+        # import here, to avoid circular import of bice.pde
+        from bice.pde._stencils import apply_periodic_stencil, central_stencil
+        offsets, coeffs = central_stencil(1, self.ddt_order)
+        return apply_periodic_stencil(u, coeffs / self.dt[0], offsets)
+
     def build_ddt_matrix(self) -> sp.csr_matrix:
         """Build the time-derivative operator ddt, using periodic finite differences"""
         # time-derivative operator
-        # TODO: build using FinDiff or numdifftoos.fornberg
-        #       then we can also support non-uniform time-grids
-        Nt = self.Nt
-        I = np.eye(Nt)
-        dt = self.dt[0]
-        ddt = np.zeros((Nt, Nt))
-        ddt += -3*np.roll(I, -4, axis=1)
-        ddt += 32*np.roll(I, -3, axis=1)
-        ddt += -168*np.roll(I, -2, axis=1)
-        ddt += 672*np.roll(I, -1, axis=1)
-        ddt -= 672*np.roll(I, 1, axis=1)
-        ddt -= -168*np.roll(I, 2, axis=1)
-        ddt -= 32*np.roll(I, 3, axis=1)
-        ddt -= -3*np.roll(I, 4, axis=1)
-        # TODO: the minus should not be here!
-        ddt /= -dt * 840
-        # convert to sparse
-        return sp.csr_matrix(ddt)
+        # TODO: support non-uniform time-grids, e.g. with Fornberg weights for each point
+        # import here, to avoid circular import of bice.pde
+        from bice.pde._stencils import build_nabla_laplace
+        ddt, _ = build_nabla_laplace(self.Nt, self.dt[0], self.ddt_order)
+        return ddt
 
     @profile
     def rhs(self, u: Array) -> Array:
@@ -93,11 +92,11 @@ class TimePeriodicOrbitHandler(Equation):
         # ... u's per timestep
         u = u[:-1].reshape((self.Nt, *self.ref_eq.shape))
         # calculate the time derivative using FD
-        dudt = self.ddt.dot(u) / T
+        dudt = self.apply_ddt(u) / T
         # same for the old variables
         T_old = self.u[-1]
         u_old = self.u[:-1].reshape((self.Nt, *self.ref_eq.shape))
-        dudt_old = self.ddt.dot(u_old) / T_old
+        dudt_old = self.apply_ddt(u_old) / T_old
         # mass matrix
         M = self.ref_eq.mass_matrix()
         # setup empty result vector
@@ -122,11 +121,11 @@ class TimePeriodicOrbitHandler(Equation):
         # ... u's per timestep
         u = u[:-1].reshape((self.Nt, *self.ref_eq.shape))
         # calculate the time derivative
-        dudt = self.ddt.dot(u) / T
+        dudt = self.apply_ddt(u) / T
         # same for the old variables
         T_old = self.u[-1]
         u_old = self.u[:-1].reshape((self.Nt, *self.ref_eq.shape))
-        dudt_old = self.ddt.dot(u_old) / T_old
+        dudt_old = self.apply_ddt(u_old) / T_old
         # mass matrix
         M = self.ref_eq.mass_matrix()
         # Jacobian of reference equation for each time step
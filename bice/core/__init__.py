@@ -3,6 +3,7 @@ The 'core' package contains all of bice's basic functionality.
 """
 
 from .equation import Equation, EquationGroup
+from .jit import JITEquation, equation_kernel
 from .problem import Problem
 from .profiling import Profiler, profile
 from .solution import BifurcationDiagram, Branch, Solution
@@ -11,6 +12,7 @@ from .solvers import EigenSolver, MyNewtonSolver, NewtonSolver
 __all__ = [
     'Problem',
     'Equation', 'EquationGroup',
+    'JITEquation', 'equation_kernel',
     'Solution', 'Branch', 'BifurcationDiagram',
     'MyNewtonSolver', 'NewtonSolver', 'EigenSolver',
     'profile', 'Profiler'
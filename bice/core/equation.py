@@ -39,6 +39,12 @@ class Equation:
         #: full dimension of the problem and need to be mapped to the equation's
         #: variables accordingly. Otherwise, they only have the dimension of this equation.
         self.is_coupled = False
+        #: How many columns of the finite difference Jacobian are calculated at once?
+        self.jacobian_batch_size = 32
+        # buffer for the perturbed unknowns in the FD Jacobian
+        self._jacobian_perturbation_buffer = None
+        # cache for the coloring of the columns of a sparse Jacobian: (sparsity, colors)
+        self._jacobian_coloring_cache = None
 
     @property
     def ndofs(self) -> int:
@@ -70,49 +76,118 @@ class Equation:
         raise NotImplementedError(
             "No right-hand side (rhs) implemented for this equation!")
 
+    def rhs_batch(self, U: Array) -> Array:
+        """
+        Calculate the right-hand side for a whole batch of unknowns U[i] at once.
+        Used for the finite difference approximation of the Jacobian.
+        Defaults to evaluating rhs(u) for each member of the batch, but may be overridden
+        with a truly vectorized implementation for specific types of equations.
+        """
+        return np.stack([self.rhs(Ui).ravel() for Ui in U])
+
     @profile
-    def jacobian(self, u: Array) -> Matrix:
+    def jacobian(self, u: Array, use_central_differences: bool = False,
+                 sparsity: Optional[Matrix] = None, f0: Optional[Array] = None) -> Matrix:
         """
         Calculate the Jacobian J = d rhs(u) / du for the unknowns u.
-        Defaults to automatic calculation of the Jacobian using finite differences.
+        Defaults to automatic calculation of the Jacobian using finite differences,
+        either forward (default) or central differences. The step size of each column
+        is scaled with the magnitude of the unknowns (cf. Dennis & Schnabel).
+        The columns of the Jacobian are calculated in batches of size
+        self.jacobian_batch_size using rhs_batch(U).
+        If the sparsity pattern of the Jacobian is given (a (sparse) matrix with nonzero
+        entries for the nonzero entries of J), columns that do not share any rows are
+        perturbed simultaneously and a sparse matrix is returned.
+        If the caller already knows the rhs of the unperturbed unknowns, e.g. the residuals in a
+        Newton solver, it may be passed as f0 to save one evaluation of the rhs.
         """
-        eps = 1e-10  # the finite perturbation size
-        use_central_differences = False  # use central or forward differences?
         N = u.size
-        J = np.zeros((N, N), dtype=u.dtype)
+        u_flat = u.ravel()
         # uncoupled equations require u to be reshaped the self.shape before calling rhs(u)
         shape = u.shape if self.is_coupled else self.shape
-        # make a copy of the unknowns
-        u1 = u.copy().ravel()
-        if use_central_differences:
-            # perturb every degree of freedom and calculate Jacobian using central FD
-            for i in np.arange(N):
-                k = u1[i]
-                u1[i] = k + eps
-                f1 = self.rhs(u1.reshape(shape)).ravel()
-                u1[i] = k - eps
-                f2 = self.rhs(u1.reshape(shape)).ravel()
-                J[i] = (f1 - f2) / (2*eps)
-                u1[i] = k
-        else:  # use forward differences
-            # reference rhs for unperturbed u
-            f0 = self.rhs(u.reshape(shape)).ravel()
-            # perturb every degree of freedom and calculate Jacobian using FD
-            for i in np.arange(N):
-                k = u1[i]
-                u1[i] = k + eps
-                f1 = self.rhs(u1.reshape(shape)).ravel()
-                J[i] = (f1 - f0) / eps
-                u1[i] = k
-        return J.T
+        # the finite perturbation sizes, relative to the magnitude of the unknowns
+        eps = np.finfo(u.dtype).eps ** (1/3 if use_central_differences else 1/2)
+        h = eps * np.maximum(np.abs(u_flat), 1.0) * np.where(np.real(u_flat) < 0, -1, 1)
+        # make sure the steps are exactly representable
+        h = (u_flat + h) - u_flat
+        # group the columns that are perturbed simultaneously by a color (index)
+        if sparsity is None:
+            colors = np.arange(N)
+        else:
+            colors = self._jacobian_coloring(sparsity)
+        ncolors = colors.max() + 1 if N > 0 else 0
+        B = max(min(self.jacobian_batch_size, ncolors), 1)
+        # the differences of the rhs for each color, every row is overwritten below
+        D = np.empty((ncolors, N), dtype=np.result_type(u.dtype, h.dtype))
+        # buffer for the perturbed unknowns, reused across batches and calls
+        buf = self._jacobian_perturbation_buffer
+        if buf is None or buf.shape != (B, N) or buf.dtype != u_flat.dtype:
+            buf = np.empty((B, N), dtype=u_flat.dtype)
+            self._jacobian_perturbation_buffer = buf
+        # reference rhs for unperturbed u
+        if not use_central_differences:
+            if f0 is None:
+                f0 = self.rhs(u.reshape(shape))
+            f0 = np.ravel(f0)
+        # perturb a batch of colors at once and calculate the differences of the rhs
+        for c0 in range(0, ncolors, B):
+            c1 = min(c0+B, ncolors)
+            # the perturbed degrees of freedom in this batch and their row within the batch
+            cols = np.flatnonzero((colors >= c0) & (colors < c1))
+            rows = colors[cols] - c0
+            # fresh copies of the unknowns, one for each color
+            U = buf[:c1-c0]
+            U[:] = u_flat
+            U[rows, cols] += h[cols]
+            f1 = self.rhs_batch(U.reshape((c1-c0, *shape)))
+            if use_central_differences:
+                U[rows, cols] -= 2*h[cols]
+                f2 = self.rhs_batch(U.reshape((c1-c0, *shape)))
+                np.subtract(f1, f2, out=D[c0:c1])
+                D[c0:c1] /= 2
+            else:
+                np.subtract(f1, f0, out=D[c0:c1])
+        if sparsity is None:
+            # each column was perturbed individually, divide by the steps in-place
+            D /= h[:, np.newaxis]
+            return D.T
+        # extract the entries of the sparse Jacobian from the differences
+        S = sp.coo_matrix(sparsity)
+        data = D[colors[S.col], S.row] / h[S.col]
+        return sp.csr_matrix((data, (S.row, S.col)), shape=(N, N))
+
+    def _jacobian_coloring(self, sparsity: Matrix) -> np.ndarray:
+        """
+        Greedy coloring of the columns of a sparsity pattern, such that columns
+        of the same color do not share any nonzero rows (Curtis-Powell-Reid).
+        The coloring is cached as long as the same sparsity object is used.
+        """
+        cache = self._jacobian_coloring_cache
+        if cache is not None and cache[0] is sparsity:
+            return cache[1]
+        S = sp.csc_matrix(sparsity, dtype=bool)
+        N = S.shape[1]
+        # columns that share a row are neighbors in the column intersection graph
+        G = sp.csr_matrix(S.T.dot(S))
+        colors = np.full(N, -1)
+        for j in range(N):
+            # assign the smallest color that is not used by any neighbor
+            used = colors[G.indices[G.indptr[j]:G.indptr[j+1]]]
+            used = np.unique(used[used >= 0])
+            free = np.flatnonzero(used != np.arange(used.size))
+            colors[j] = free[0] if free.size > 0 else used.size
+        self._jacobian_coloring_cache = (sparsity, colors)
+        return colors
 
     def mass_matrix(self) -> Matrix:
         """
         The mass matrix M determines the linear relation of the rhs to the temporal derivatives:
         M * du/dt = rhs(u)
+        Defaults to the identity, as a sparse (CSR) matrix, so that no dense N x N array is
+        allocated and it can directly be combined with sparse Jacobians.
         """
         # default case: assume the identity matrix I (--> du/dt = rhs(u))
-        return sp.eye(self.ndofs)
+        return sp.eye(self.ndofs, format="csr")
 
     def adapt(self) -> None:
         """
@@ -179,15 +254,26 @@ class EquationGroup:
         self.idx = {}
         #: optional reference to a parent EquationGroup
         self.group: Optional["EquationGroup"] = None
-        # optionally add the given equations
+        # cache for the assembled mass matrix, the mass matrices of the equations are assumed to
+        # be constant, unless the mapping of the unknowns changes (e.g. equations added/reshaped)
+        self._mass_matrix_cache = None
+        # the number of unknowns, updated with the mapping of the unknowns
+        self._ndofs = 0
+        # the (equation, slice) pairs of the mapping, in the order of the equations,
+        # so that the assembly loops do not need to look up self.idx
+        self._mapping = []
+        # the only sub-equation, if there is exactly one (None otherwise), for the fast path
+        self._single_equation = None
+        # optionally add the given equations, the mapping is done only once for all of them
         if equations is not None:
             for eq in equations:
-                self.add_equation(eq)
+                self._add_equation(eq)
+            self.map_unknowns()
 
     @property
     def ndofs(self) -> int:
         """The number of unknowns / degrees of freedom of the group"""
-        return sum([eq.ndofs for eq in self.equations])
+        return self._ndofs
 
     @property
     def shape(self) -> Shape:
@@ -207,27 +293,32 @@ class EquationGroup:
     @u.setter
     def u(self, u) -> None:
         """set the unknowns"""
-        for eq in self.equations:
+        for eq, idx in self._mapping:
             # extract the equation's unknowns using the mapping and reshape to the equation's shape
-            eq.u = u[self.idx[eq]].reshape(eq.shape)
+            eq.u = u[idx].reshape(eq.shape)
 
     def add_equation(self, eq: EquationLike) -> None:
         """add an equation to the group"""
+        if self._add_equation(eq):
+            # redo the mapping from equation's to group's unknowns
+            self.map_unknowns()
+
+    def _add_equation(self, eq: EquationLike) -> bool:
+        """add an equation to the group without redoing the mapping, return success"""
         # check if eq already in self.equations
         if eq in self.equations:
             print("Error: Equation is already part of this group!")
-            return
+            return False
         # check if eq already in other group
         if hasattr(eq, "group") and not isinstance(eq.group, DummyEquationGroup):
             print("Error: Equation is already part of another group of equations!"
                   "Remove equation from other group first!")
-            return
+            return False
         # append to list of equations
         self.equations.append(eq)
         # assign this group as the equation's group
         eq.group = self
-        # redo the mapping from equation's to group's unknowns
-        self.map_unknowns()
+        return True
 
     def remove_equation(self, eq: EquationLike) -> None:
         """remove an equation from the group"""
@@ -247,6 +338,8 @@ class EquationGroup:
         Create the mapping from equation unknowns to group unknowns, in the sense
         that group.u[idx[eq]] = eq.u.ravel() where idx is the mapping
         """
+        # the assembled mass matrix needs to be rebuilt
+        self._mass_matrix_cache = None
         # counter for the current position in group.u
         i = 0
         # assign index range for each equation according to their dimension
@@ -260,6 +353,10 @@ class EquationGroup:
             self.idx[eq] = slice(i, i+eq.ndofs)
             # increment counter by the equation's number of degrees of freedom
             i += eq.ndofs
+        # the total number of unknowns
+        self._ndofs = i
+        self._mapping = [(eq, self.idx[eq]) for eq in self.equations]
+        self._single_equation = self.equations[0] if len(self.equations) == 1 else None
         # if there is a parent group, update its mapping as well
         if self.group:
             self.group.map_unknowns()
@@ -268,20 +365,26 @@ class EquationGroup:
     def rhs(self, u: Array) -> Array:
         """Calculate the right-hand side of the group 0 = rhs(u)"""
         # if there is only one equation, we can return the rhs directly
-        if len(self.equations) == 1:
-            eq = self.equations[0]
+        eq = self._single_equation
+        if eq is not None:
             shape = u.shape if eq.is_coupled else eq.shape
             return eq.rhs(u.reshape(shape)).ravel()
+        # if no equation is coupled, the equations' slices cover the result vector exactly once,
+        # so we can simply write the contributions without zero-filling and summation
+        if not any(eq.is_coupled for eq in self.equations):
+            res = np.empty(self.ndofs, dtype=u.dtype)
+            for eq, idx in self._mapping:
+                res[idx] = eq.rhs(u[idx].reshape(eq.shape)).ravel()
+            return res
         # otherwise, we need to assemble the result vector
         res = np.zeros(self.ndofs, dtype=u.dtype)
         # add the contributions of each equation
-        for eq in self.equations:
+        for eq, idx in self._mapping:
             if eq.is_coupled:
                 # coupled equations work on the full set of variables
                 res += eq.rhs(u)
             else:
                 # uncoupled equations simply work on their own variables, so we do the mapping
-                idx = self.idx[eq]
                 res[idx] += eq.rhs(u[idx].reshape(eq.shape)).ravel()
         # everything assembled, return result
         return res
@@ -290,42 +393,56 @@ class EquationGroup:
     def jacobian(self, u: Array) -> Matrix:
         """Calculate the Jacobian J = d rhs(u) / du for the unknowns u"""
         # if there is only one equation, we can return the matrix directly
-        if len(self.equations) == 1:
-            eq = self.equations[0]
+        eq = self._single_equation
+        if eq is not None:
             shape = u.shape if eq.is_coupled else eq.shape
             return eq.jacobian(u.reshape(shape))
-        # otherwise, we need to assemble the matrix
-        J = sp.csr_matrix((self.ndofs, self.ndofs), dtype=u.dtype)
-        # add the Jacobian of each equation
-        J_uncoupled = []
-        for eq in self.equations:
+        # otherwise, we need to assemble the matrix from the (row, col, data) triplets
+        # of the equation's Jacobians
+        rows, cols, data = [], [], []
+        for eq, idx in self._mapping:
             if eq.is_coupled:
                 # coupled equations work on the full set of variables
                 eq_jac = eq.jacobian(u)
-                if not sp.issparse(eq_jac):
-                    eq_jac = sp.csr_matrix(eq_jac)
-                # simply add to the global Jacobian
-                J += eq_jac
-                # add dummy matrix to J_uncoupled
-                J_uncoupled.append(sp.csr_matrix((eq.ndofs, eq.ndofs)))
+                offset = 0
             else:
                 # uncoupled equations work on their own variables, so we do a mapping
-                idx = self.idx[eq]
                 eq_jac = eq.jacobian(u[idx].reshape(eq.shape))
-                if not sp.issparse(eq_jac):
-                    eq_jac = sp.csr_matrix(eq_jac)
-                # add to list to later construct the global Jacobian
-                J_uncoupled.append(eq_jac)
-        # add contributions of uncoupled equations
-        J += sp.block_diag(J_uncoupled, format="csr")
+                offset = idx.start
+            # (disabled) equations may return a scalar zero instead of a matrix
+            if np.isscalar(eq_jac) and eq_jac == 0:
+                continue
+            eq_jac = sp.coo_matrix(eq_jac)
+            rows.append(eq_jac.row + offset)
+            cols.append(eq_jac.col + offset)
+            data.append(eq_jac.data)
+        # build the global Jacobian at once, duplicate entries are summed up
+        N = self.ndofs
+        if not data:
+            return sp.csr_matrix((N, N), dtype=u.dtype)
+        J = sp.coo_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(N, N))
         # all entries assembled, return
-        return J
+        return J.tocsr()
 
     def mass_matrix(self) -> Matrix:
         """
         The mass matrix determines the linear relation of the rhs to the temporal derivatives:
         M * du/dt = rhs(u)
+        The assembled matrix is cached, call invalidate_mass_matrix() if it changed otherwise.
         """
+        if self._mass_matrix_cache is None:
+            self._mass_matrix_cache = self._assemble_mass_matrix()
+        return self._mass_matrix_cache
+
+    def invalidate_mass_matrix(self) -> None:
+        """Discard the cached mass matrix, e.g. if an equation's mass matrix has changed"""
+        self._mass_matrix_cache = None
+        if self.group:
+            self.group.invalidate_mass_matrix()
+
+    def _assemble_mass_matrix(self) -> Matrix:
+        """Assemble the mass matrix from the mass matrices of the equations"""
         # if there is only one equation, we can return the matrix directly
         if len(self.equations) == 1:
             return self.equations[0].mass_matrix()
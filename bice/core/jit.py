@@ -0,0 +1,110 @@
+"""
+This submodule provides optional just-in-time compilation of the right-hand side
+of equations with numba. The rhs is evaluated many times, e.g., N+1 times for the
+finite difference Jacobian and in every Newton iteration, so compiling the tight
+NumPy expression into native code directly speeds up the whole solver.
+If numba is not installed, everything falls back to plain (uncompiled) Python/NumPy.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+from .types import Array
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+#: Is numba available for the compilation of kernels?
+HAS_NUMBA = numba is not None
+
+#: numba.prange for the loops of kernels that are compiled with parallel=True,
+#: falls back to range if numba is not installed
+prange = numba.prange if HAS_NUMBA else range
+
+
+def equation_kernel(func: Callable = None, **options) -> Callable:
+    """
+    This is a decorator (@equation_kernel), that compiles a function with numba.njit,
+    by default with cache=True and fastmath=True. Additional options, e.g. parallel=True,
+    are passed to numba.njit. The function may only use the NumPy features supported by numba.
+    If numba is not installed, the function is returned unchanged.
+    """
+    options = {"cache": True, "fastmath": True, **options}
+
+    def decorate(f: Callable) -> Callable:
+        if not HAS_NUMBA:
+            return f
+        return numba.njit(**options)(f)
+
+    # support both @equation_kernel and @equation_kernel(...) syntax
+    if func is None:
+        return decorate
+    return decorate(func)
+
+
+def newton_generator(rhs_kernel: Callable, jac_kernel: Callable, **options) -> Callable:
+    """
+    Generate a compiled Newton iteration for the system rhs_kernel(u, *args) = 0 with the dense
+    Jacobian jac_kernel(u, *args), both being kernels that are supported by numba. Since the
+    whole iteration is compiled, no Python code is executed in between the Newton steps.
+    Returns the function newton(u0, args, max_iterations, tolerance) -> (u, niterations, error),
+    where error is the maximum absolute residual of the solution u.
+    Options are passed to numba.njit, see @equation_kernel.
+    """
+    # the kernels may already be compiled
+    rhs = rhs_kernel if hasattr(rhs_kernel, "py_func") else equation_kernel(rhs_kernel)
+    jac = jac_kernel if hasattr(jac_kernel, "py_func") else equation_kernel(jac_kernel)
+
+    def newton(u0, args, max_iterations, tolerance):
+        u = u0.copy()
+        res = rhs(u, *args)
+        err = np.max(np.abs(res))
+        niterations = 0
+        while err >= tolerance and niterations < max_iterations:
+            u -= np.linalg.solve(jac(u, *args), res)
+            niterations += 1
+            res = rhs(u, *args)
+            err = np.max(np.abs(res))
+        return u, niterations, err
+
+    # functions that refer to other compiled functions cannot be cached to disk
+    return equation_kernel(newton, **{"cache": False, **options})
+
+
+class JITEquation:
+    """
+    Mixin for equations, whose right-hand side is given by a compiled kernel.
+    Subclasses implement the @staticmethod rhs_kernel(u, *args), using only
+    NumPy operations supported by numba, and kernel_args(u) that returns the
+    additional arguments of the kernel, e.g., the parameters of the equation.
+    Operations that numba does not support, such as the multiplication with
+    scipy's sparse matrices (e.g. nabla @ u), should be done in kernel_args(u),
+    so that only the result is passed into the kernel.
+    The kernel is compiled with @equation_kernel at the first call of rhs(u).
+    Usage: class MyEquation(JITEquation, FiniteDifferencesEquation): ...
+    """
+
+    @staticmethod
+    def rhs_kernel(u: Array, *args) -> Array:
+        """The kernel of the right-hand side, to be compiled with numba"""
+        raise NotImplementedError(
+            "No right-hand side kernel (rhs_kernel) implemented for this equation!")
+
+    def kernel_args(self, u: Array) -> tuple:
+        """The additional arguments that are passed to rhs_kernel(u, *args)"""
+        return ()
+
+    def rhs(self, u: Array) -> Array:
+        """Calculate the right-hand side of the equation 0 = rhs(u) using the compiled kernel"""
+        cls = type(self)
+        # the compiled kernel is cached per class, look it up in the class itself
+        # rather than inheriting the kernel of a parent class
+        kernel = cls.__dict__.get("_compiled_rhs_kernel")
+        if kernel is None:
+            kernel = equation_kernel(cls.rhs_kernel)
+            cls._compiled_rhs_kernel = kernel
+        return kernel(u, *self.kernel_args(u))
@@ -128,7 +128,10 @@ class Problem():
         M * du/dt = rhs(u)
         """
         assert self.eq is not None
-        # return the mass matrix of the (system of) equations
+        # a single equation always belongs to a (dummy) group, that caches the mass matrix
+        if isinstance(self.eq, Equation):
+            return self.eq.group.mass_matrix()
+        # return the (cached) mass matrix of the system of equations
         return self.eq.mass_matrix()
 
     @profile
@@ -137,13 +140,18 @@ class Problem():
         self.u = self.newton_solver.solve(self.rhs, self.u, self.jacobian)
 
     @profile
-    def solve_eigenproblem(self) -> Tuple[np.ndarray, np.ndarray]:
+    def solve_eigenproblem(self, J=None, M=None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Calculate the eigenvalues and eigenvectors of the Jacobian
         The method will only calculate as many eigenvalues as requested with self.settings.neigs
+        J and M are the Jacobian and the mass matrix, that may optionally be passed
+        if they are already known. Otherwise, they are calculated at the current state.
         """
-        return self.eigen_solver.solve(
-            self.jacobian(self.u), self.mass_matrix(), k=self.settings.neigs)
+        if J is None:
+            J = self.jacobian(self.u)
+        if M is None:
+            M = self.mass_matrix()
+        return self.eigen_solver.solve(J, M, k=self.settings.neigs)
 
     @profile
     def time_step(self) -> None:
@@ -177,14 +185,15 @@ class Problem():
         branch.add_solution_point(sol)
         # if desired, solve the eigenproblem
         if self.settings.neigs is None or self.settings.neigs > 0:
-            # solve the eigenproblem
-            eigenvalues, _ = self.solve_eigenproblem()
+            # solve the eigenproblem, reuse the Jacobian of the continuation stepper, if available
+            eigenvalues, _ = self.solve_eigenproblem(
+                J=getattr(self.continuation_stepper, "last_jacobian", None))
             # count number of positive eigenvalues
             tol = self.settings.eigval_zero_tolerance
-            sol.nunstable_eigenvalues = len(
-                [ev for ev in eigenvalues if np.real(ev) > tol])
-            sol.nunstable_imaginary_eigenvalues = len(
-                [ev for ev in eigenvalues if np.real(ev) > tol and abs(np.imag(ev)) > tol])
+            unstable = np.real(eigenvalues) > tol
+            sol.set_eigenvalues(
+                int(np.count_nonzero(unstable)),
+                int(np.count_nonzero(unstable & (np.abs(np.imag(eigenvalues)) > tol))))
         # optionally locate bifurcations
         if self.settings.always_locate_bifurcations and sol.is_bifurcation():
             u_old = self.u.copy()
@@ -199,8 +208,8 @@ class Problem():
                 branch.add_solution_point(new_sol)
                 # adapt the number of unstable eigenvalues from the point that
                 # overshot the bifurcation
-                new_sol.nunstable_eigenvalues = sol.nunstable_eigenvalues
-                new_sol.nunstable_imaginary_eigenvalues = sol.nunstable_imaginary_eigenvalues
+                new_sol.set_eigenvalues(sol.nunstable_eigenvalues,
+                                        sol.nunstable_imaginary_eigenvalues)
                 # TODO: add the original solution point back to the branch?
             # reset the state to the original solution, assures continuation in right direction
             self.u = u_old
@@ -422,6 +431,8 @@ class Problem():
         """adapt the problem/equations to the solution (e.g. by mesh refinement)"""
         for eq in self.list_equations():
             eq.adapt()
+        # the unknowns changed, the time-stepper's rhs is no longer valid
+        self.time_stepper.last_rhs = None
 
     def log(self, *args, **kwargs) -> None:
         """
@@ -469,15 +480,13 @@ class Problem():
             # plot the eigenvalues, if any
             if self.eigen_solver.latest_eigenvalues is not None:
                 ev_re = np.real(self.eigen_solver.latest_eigenvalues)
-                ev_re_n = np.ma.masked_where(
-                    ev_re > self.settings.eigval_zero_tolerance, ev_re)
-                ev_re_p = np.ma.masked_where(
-                    ev_re <= self.settings.eigval_zero_tolerance, ev_re)
-                ev_is_imag = np.ma.masked_where(
-                    np.abs(np.imag(self.eigen_solver.latest_eigenvalues)) <= self.settings.eigval_zero_tolerance, ev_re)
-                eigval_ax.plot(ev_re_n, "o", color="C0", label="Re < 0")
-                eigval_ax.plot(ev_re_p, "o", color="C1", label="Re > 0")
-                eigval_ax.plot(ev_is_imag, "x", color="black",
+                tol = self.settings.eigval_zero_tolerance
+                # plot the eigenvalues over their index, selected with boolean masks
+                pos = ev_re > tol
+                is_imag = np.abs(np.imag(self.eigen_solver.latest_eigenvalues)) > tol
+                eigval_ax.plot(np.nonzero(~pos)[0], ev_re[~pos], "o", color="C0", label="Re < 0")
+                eigval_ax.plot(np.nonzero(pos)[0], ev_re[pos], "o", color="C1", label="Re > 0")
+                eigval_ax.plot(np.nonzero(is_imag)[0], ev_re[is_imag], "x", color="black",
                                label="complex", alpha=0.6)
                 eigval_ax.axhline(0, color="gray")
                 eigval_ax.legend()
@@ -713,7 +722,8 @@ class ProblemSettings():
 
     def __init__(self) -> None:
         #: How many eigenvalues should be computed when problem.solve_eigenproblem() is called?
-        #: Set to 'None' for computing all eigenvalues using a direct solver.
+        #: Set to 'None' for computing all eigenvalues using a direct solver
+        #: (for sparse Jacobians, see eigen_solver.default_k).
         #: TODO: could have a more verbose name
         self.neigs: Union[int, None] = 20
         #: How small does an eigenvalue need to be in order to be counted as 'zero'?
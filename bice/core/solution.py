@@ -3,7 +3,9 @@ This file describes a data structure for Solutions, Branches and BifurcationDiag
 """
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, Tuple
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+import bisect
 
 import numpy as np
 
@@ -11,6 +13,19 @@ if TYPE_CHECKING:
     from bice.core.problem import Problem
 
 
+# lookup table of the types of regular bifurcations, i.e., the +/- signs for the number of
+# eigenvalues that crossed the imaginary axis: _BIF_STR[n + _BIF_STR_MAX] for n eigenvalues
+_BIF_STR_MAX = 20
+_BIF_STR = ["-"*(-n) if n < 0 else "+"*n for n in range(-_BIF_STR_MAX, _BIF_STR_MAX+1)]
+
+
+def _bifurcation_signs(n: int) -> str:
+    """+/- signs corresponding to the n null-eigenvalues of a regular bifurcation"""
+    if abs(n) <= _BIF_STR_MAX:
+        return _BIF_STR[n + _BIF_STR_MAX]
+    return "+"*n if n > 0 else "-"*(-n)
+
+
 class Solution:
     """
     Stores the solution of a problem, including the relevant parameters,
@@ -20,28 +35,109 @@ class Solution:
     # static variable counting the total number of Solutions
     _solution_count = 0
 
-    def __init__(self, problem: Optional['Problem'] = None) -> None:
-        # generate solution ID
-        Solution._solution_count += 1
+    def __init__(self, problem: Optional['Problem'] = None, solution_id: Optional[int] = None) -> None:
+        # generate solution ID, unless an already reserved one is given
+        if solution_id is None:
+            Solution._solution_count += 1
+            solution_id = Solution._solution_count
         #: unique identifier of the solution
-        self.id = Solution._solution_count
+        self.id = solution_id
         # TODO: storing each solution's data may eat up some memory
         #       do we need to save every solution? maybe save bifurcations only
-        #: The current problem state as a dictionary of data (equation's unknowns and parameters)
-        self.data = problem.save() if problem is not None else {}
-        #: value of the continuation parameter
-        self.p = problem.get_continuation_parameter() if problem is not None else 0
-        #: value of the solution norm
-        self.norm = problem.norm() if problem is not None else 0
-        #: number of true positive eigenvalues
-        self.nunstable_eigenvalues: Optional[int] = None
-        #: number of true positive and imaginary eigenvalues
-        self.nunstable_imaginary_eigenvalues: Optional[int] = None
+        # The current problem state as a dictionary of data (equation's unknowns and parameters).
+        # Once the solution is part of a branch, the (heavy) snapshot is kept by the branch,
+        # separately from the scalar properties.
+        self._data = problem.save() if problem is not None else {}
         #: optional reference to the corresponding branch
         self.branch: Optional[Branch] = None
+        # index of the solution in the branch's arrays and list of solutions,
+        # set when added to a branch, updated when preceding solutions are removed
+        # and reset to -1 when the solution itself is removed
+        self._idx = -1
+        # The scalar properties of the solution (parameter, norm, number of unstable eigenvalues)
+        # are stored in contiguous arrays in the branch, once the solution is part of a branch.
+        # Until then, they are stored with the solution itself.
+        self._p = problem.get_continuation_parameter() if problem is not None else 0
+        self._norm = problem.norm() if problem is not None else 0
+        self._nue = -1
+        self._nue_imag = -1
         # cache for the bifurcation type
         self._bifurcation_type: Optional[str] = None
 
+    def _get(self, name: str):
+        """get a scalar property, either from the branch's arrays or the local storage"""
+        if self.branch is None:
+            return getattr(self, name)
+        return getattr(self.branch, name)[self._idx]
+
+    def _set(self, name: str, value) -> None:
+        """set a scalar property, either in the branch's arrays or in the local storage"""
+        if self.branch is None:
+            setattr(self, name, value)
+        elif name in self.branch._known:
+            self.branch._set_count(name, self._idx, value)
+        else:
+            getattr(self.branch, name)[self._idx] = value
+
+    @property
+    def data(self) -> dict:
+        """The problem state as a dictionary of data (equation's unknowns and parameters)"""
+        if self.branch is None:
+            return self._data
+        return self.branch._snapshots[self._idx]
+
+    @data.setter
+    def data(self, data: dict) -> None:
+        if self.branch is None:
+            self._data = data
+        else:
+            self.branch._snapshots[self._idx] = data
+
+    @property
+    def p(self) -> float:
+        """value of the continuation parameter"""
+        return self._get("_p")
+
+    @p.setter
+    def p(self, v: float) -> None:
+        self._set("_p", v)
+
+    @property
+    def norm(self) -> float:
+        """value of the solution norm"""
+        return self._get("_norm")
+
+    @norm.setter
+    def norm(self, v: float) -> None:
+        self._set("_norm", v)
+
+    @property
+    def nunstable_eigenvalues(self) -> Optional[int]:
+        """number of true positive eigenvalues"""
+        n = self._get("_nue")
+        return None if n < 0 else int(n)
+
+    @nunstable_eigenvalues.setter
+    def nunstable_eigenvalues(self, n: Optional[int]) -> None:
+        # unknown numbers of eigenvalues are stored as -1
+        self._set("_nue", -1 if n is None else n)
+
+    @property
+    def nunstable_imaginary_eigenvalues(self) -> Optional[int]:
+        """number of true positive and imaginary eigenvalues"""
+        n = self._get("_nue_imag")
+        return None if n < 0 else int(n)
+
+    @nunstable_imaginary_eigenvalues.setter
+    def nunstable_imaginary_eigenvalues(self, n: Optional[int]) -> None:
+        # unknown numbers of eigenvalues are stored as -1
+        self._set("_nue_imag", -1 if n is None else n)
+
+    def set_eigenvalues(self, n: Optional[int], n_imag: Optional[int]) -> None:
+        """Set the number of unstable (and unstable imaginary) eigenvalues"""
+        self.nunstable_eigenvalues = n
+        self.nunstable_imaginary_eigenvalues = n_imag
+
     @property
     def neigenvalues_crossed(self) -> Optional[int]:
         """How many eigenvalues have crossed the imaginary axis with this solution?"""
@@ -49,15 +145,7 @@ class Solution:
         if self.branch is None or self.nunstable_eigenvalues is None:
             return None
         # else, compare with the nearest previous neighbor that has info on eigenvalues
-        # get branch points with eigenvalue info
-        bps = [s for s in self.branch.solutions if s.nunstable_eigenvalues is not None]
-        # find index of previous solution
-        index = bps.index(self) - 1
-        if index < 0:
-            # if there is no previous solution with info on eigenvalues, we have no result
-            return None
-        # return the difference in unstable eigenvalues to the previous solution
-        return self.nunstable_eigenvalues - bps[index].nunstable_eigenvalues
+        return self.branch._eigenvalues_crossed("_nue", self._idx)
 
     @property
     def nimaginary_eigenvalues_crossed(self) -> Optional[int]:
@@ -66,16 +154,7 @@ class Solution:
         if self.branch is None or self.nunstable_imaginary_eigenvalues is None:
             return None
         # else, compare with the nearest previous neighbor that has info on eigenvalues
-        # get branch points with eigenvalue info
-        bps = [
-            s for s in self.branch.solutions if s.nunstable_imaginary_eigenvalues is not None]
-        # find index of previous solution
-        index = bps.index(self) - 1
-        if index < 0:
-            # if there is no previous solution with info on eigenvalues, we have no result
-            return None
-        # return the difference in unstable eigenvalues to the previous solution
-        return self.nunstable_imaginary_eigenvalues - bps[index].nunstable_imaginary_eigenvalues
+        return self.branch._eigenvalues_crossed("_nue_imag", self._idx)
 
     def is_stable(self) -> Optional[bool]:
         """Is the solution stable?"""
@@ -110,8 +189,7 @@ class Solution:
         # otherwise it is some kind of bifurcation point (BP)
         # self._bifurcation_type = "BP"
         # use +/- signs corresponding to their null-eigenvalues as type for regular bifurcations
-        n = nev_crossed
-        self._bifurcation_type = "+"*n if n > 0 else "-"*(-n)
+        self._bifurcation_type = _bifurcation_signs(nev_crossed)
         # check for Hopf bifurcations by number of imaginary eigenvalues that crossed zero
         nev_imag_crossed = self.nimaginary_eigenvalues_crossed
         # if it is not unknown or zero or one, this must be a Hopf point
@@ -125,7 +203,8 @@ class Solution:
         # if we don't know the branch, there is no neighboring solutions
         if self.branch is None:
             return None
-        index = self.branch.solutions.index(self) + distance
+        # the solution knows its own index in the branch, no need to search for it
+        index = self._idx + distance
         # if index out of range, there is no neighbor at requested distance
         if index < 0 or index >= len(self.branch.solutions):
             return None
@@ -133,6 +212,68 @@ class Solution:
         return self.branch.solutions[index]
 
 
+class SolutionsView:
+    """
+    List-like view of the solutions on a branch. The properties of the solutions are stored in
+    the branch's arrays, the Solution objects are merely handles to them. For branches that were
+    restored in bulk (e.g. loaded from a file), the Solution objects are created lazily on first
+    access and kept afterwards, so that each index always refers to the same object. Their IDs are
+    reserved when the branch is restored, so they do not depend on the order of access.
+    """
+
+    def __init__(self, branch: Branch) -> None:
+        self._branch = branch
+        # the Solution objects, or their reserved IDs if not yet created
+        self._items: list[Union[Solution, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("solution index out of range")
+        solution = self._items[i]
+        if not isinstance(solution, Solution):
+            # create the handle to the stored solution, with the reserved ID
+            solution = Solution(solution_id=solution)
+            solution._data = None
+            solution.branch = self._branch
+            solution._idx = i
+            self._items[i] = solution
+        return solution
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index(self, solution: Solution) -> int:
+        """The index of the given solution"""
+        if solution.branch is not self._branch:
+            raise ValueError("solution is not on this branch")
+        return solution._idx
+
+    def append(self, solution: Solution) -> None:
+        """Append a Solution object"""
+        self._items.append(solution)
+
+    def _extend_lazy(self, n: int) -> None:
+        """Add n solutions, whose objects will be created on first access"""
+        # reserve the IDs of the solutions now, in the order of the branch
+        first_id = Solution._solution_count + 1
+        Solution._solution_count += n
+        self._items.extend(range(first_id, first_id + n))
+
+    def _pop(self, i: int) -> None:
+        """Remove the solution at index i, the following solutions move by one position"""
+        self._items.pop(i)
+        for solution in self._items[i:]:
+            if isinstance(solution, Solution):
+                solution._idx -= 1
+
+
 class Branch:
     """
     A branch is obtained from a parameter continuation and stores a list of solution objects,
@@ -148,14 +289,87 @@ class Branch:
         #: unique identifier of the branch
         self.id = Branch._branch_count
         #: list of solutions along the branch
-        self.solutions = []
+        self.solutions = SolutionsView(self)
+        # The scalar properties of the solutions are stored in contiguous arrays
+        # (structure of arrays), so we can work on them with vectorized operations.
+        # The arrays grow in chunks, only the first len(self.solutions) entries are valid.
+        # values of the continuation parameter
+        self._p = np.empty(0)
+        # values of the solution norm
+        self._norm = np.empty(0)
+        # number of unstable (and unstable imaginary) eigenvalues, -1 if unknown
+        self._nue = np.empty(0, dtype=np.int32)
+        self._nue_imag = np.empty(0, dtype=np.int32)
+        # the snapshots of the problem state (Solution.data) of each solution
+        self._snapshots = []
+        # sorted indices of the solutions with a known number of eigenvalues, per array
+        self._known = {"_nue": [], "_nue_imag": []}
 
     def is_empty(self) -> bool:
         """Is the current branch empty?"""
         return len(self.solutions) == 0
 
+    def _append(self, p: float, norm: float, nue: int, nue_imag: int) -> int:
+        """Append the scalar properties of a solution to the arrays, return its index"""
+        n = len(self.solutions)
+        # grow the arrays geometrically, if needed
+        if n >= self._p.size:
+            size = max(16, 2 * self._p.size)
+            self._p = np.resize(self._p, size)
+            self._norm = np.resize(self._norm, size)
+            self._nue = np.resize(self._nue, size)
+            self._nue_imag = np.resize(self._nue_imag, size)
+        self._p[n] = p
+        self._norm[n] = norm
+        self._nue[n] = nue
+        self._nue_imag[n] = nue_imag
+        # the new index is the largest, so the index lists stay sorted
+        for name, value in [("_nue", nue), ("_nue_imag", nue_imag)]:
+            if value >= 0:
+                self._known[name].append(n)
+        return n
+
+    def _set_count(self, name: str, idx: int, n: int) -> None:
+        """Set a number of eigenvalues (-1 if unknown) and keep track of the known ones"""
+        arr = getattr(self, name)
+        known = self._known[name]
+        if (arr[idx] >= 0) != (n >= 0):
+            if n >= 0:
+                bisect.insort(known, idx)
+            else:
+                known.pop(bisect.bisect_left(known, idx))
+        arr[idx] = n
+
+    def _prev_eig_solution(self, name: str, idx: int) -> Optional[int]:
+        """
+        Index of the nearest solution before index idx with a known number of
+        eigenvalues in the array with the given name, or None if there is none
+        """
+        known = self._known[name]
+        k = bisect.bisect_left(known, idx)
+        return known[k-1] if k > 0 else None
+
+    def _eigenvalues_crossed(self, name: str, idx: int) -> Optional[int]:
+        """
+        Difference in the number of unstable eigenvalues (in the array with the given name)
+        of the solution at index idx and the nearest previous solution with eigenvalue info
+        """
+        prev = self._prev_eig_solution(name, idx)
+        if prev is None:
+            # if there is no previous solution with info on eigenvalues, we have no result
+            return None
+        # return the difference in unstable eigenvalues to the previous solution
+        nue = getattr(self, name)
+        return int(nue[idx] - nue[prev])
+
     def add_solution_point(self, solution: Solution) -> None:
         """Add a solution to the branch"""
+        # move the solution's scalar properties to the branch's arrays
+        solution._idx = self._append(solution._p, solution._norm,
+                                     solution._nue, solution._nue_imag)
+        # move the snapshot of the problem state to the branch
+        self._snapshots.append(solution._data)
+        solution._data = None
         # assign this branch as the solution's branch
         solution.branch = self
         # add solution to list
@@ -163,19 +377,65 @@ class Branch:
 
     def remove_solution_point(self, solution: Solution) -> None:
         """Remove a solution from the branch"""
-        self.solutions.remove(solution)
+        i = solution._idx
+        n = len(self.solutions)
+        # move the solution's scalar properties back to the solution itself
+        solution._p = self._p[i]
+        solution._norm = self._norm[i]
+        solution._nue = self._nue[i]
+        solution._nue_imag = self._nue_imag[i]
+        solution._data = self._snapshots.pop(i)
+        solution.branch = None
+        solution._idx = -1
+        # remove the entries from the arrays
+        for arr in [self._p, self._norm, self._nue, self._nue_imag]:
+            arr[i:n-1] = arr[i+1:n]
+        for name, known in self._known.items():
+            # drop the index of the removed solution and shift the following ones
+            k = bisect.bisect_left(known, i)
+            if k < len(known) and known[k] == i:
+                known.pop(k)
+            known[k:] = [j - 1 for j in known[k:]]
+        self.solutions._pop(i)
 
     def parameter_vals(self) -> np.ndarray:
         """List of continuation parameter values along the branch"""
-        return np.array([s.p for s in self.solutions])
+        return self._p[:len(self.solutions)].copy()
 
     def norm_vals(self) -> np.ndarray:
         """list of solution norm values along the branch"""
-        return np.array([s.norm for s in self.solutions])
+        return self._norm[:len(self.solutions)].copy()
+
+    def _bifurcation_mask(self) -> np.ndarray:
+        """Boolean array: which solutions on the branch are bifurcation points?"""
+        nue = self._nue[:len(self.solutions)]
+        # indices of the solutions with info on eigenvalues
+        known = np.flatnonzero(nue >= 0)
+        # bifurcations are where the number of unstable eigenvalues changes
+        # w.r.t. the previous solution with eigenvalue info
+        mask = np.zeros(nue.size, dtype=bool)
+        mask[known[1:]] = np.diff(nue[known]) != 0
+        return mask
+
+    def bifurcation_types(self) -> np.ndarray:
+        """
+        Array of the bifurcation types (as in Solution.bifurcation_type()) of all solutions
+        on the branch, with empty strings for regular points
+        """
+        n = len(self.solutions)
+        types = np.full(n, "", dtype=object)
+        for i in np.flatnonzero(self._bifurcation_mask()):
+            # use +/- signs corresponding to their null-eigenvalues as type for regular bifurcations
+            nev_crossed = self._eigenvalues_crossed("_nue", i)
+            types[i] = _bifurcation_signs(nev_crossed)
+            # check for Hopf bifurcations by number of imaginary eigenvalues that crossed zero
+            if self._nue_imag[i] >= 0 and self._eigenvalues_crossed("_nue_imag", i) not in [None, 0, 1]:
+                types[i] = "HP"
+        return types
 
     def bifurcations(self) -> list:
         """List all bifurcation points on the branch"""
-        return [s for s in self.solutions if s.is_bifurcation()]
+        return [self.solutions[i] for i in np.flatnonzero(self._bifurcation_mask())]
 
     def data(self, only=None) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -186,30 +446,56 @@ class Branch:
         - only="bifurcations": bifurcations only
         """
         condition = False
+        nue = self._nue[:len(self.solutions)]
         if only == "stable":
-            condition = [not s.is_stable() for s in self.solutions]
+            # mask unstable solutions and those with unknown stability
+            condition = nue != 0
         elif only == "unstable":
-            condition = [s.is_stable() for s in self.solutions]
+            condition = nue == 0
         elif only == "bifurcations":
-            condition = [not s.is_bifurcation() for s in self.solutions]
+            condition = ~self._bifurcation_mask()
         # mask lists where condition is met and return
         pvals = np.ma.masked_where(condition, self.parameter_vals())
         nvals = np.ma.masked_where(condition, self.norm_vals())
         return (pvals, nvals)
 
-    def save(self, filename: str) -> None:
-        """Store the branch to the disk in a format that allows for restoring it later"""
+    def save(self, filename: str, dtype=None) -> None:
+        """
+        Store the branch to the disk in a format that allows for restoring it later.
+        The data is compressed. Optionally, the floating point arrays of the solutions' data
+        (e.g. the unknowns) are stored with a reduced precision dtype, e.g. np.float32.
+        """
+        n = len(self.solutions)
         # dict of data to store
         data = {}
-        data["solution_data"] = [s.data for s in self.solutions]
-        data["norm"] = [s.norm for s in self.solutions]
-        data["p"] = [s.p for s in self.solutions]
-        data["nunstable_eigenvalues"] = [
-            s.nunstable_eigenvalues for s in self.solutions]
-        data["nunstable_imaginary_eigenvalues"] = [
-            s.nunstable_imaginary_eigenvalues for s in self.solutions]
+        snapshots = self._snapshots
+        if dtype is not None:
+            snapshots = [{key: _cast_floats(val, dtype) for key, val in snapshot.items()}
+                         for snapshot in snapshots]
+        data["solution_data"] = snapshots
+        data["norm"] = self._norm[:n]
+        data["p"] = self._p[:n]
+        # unknown numbers of eigenvalues are stored as -1, the counts are small
+        data["nunstable_eigenvalues"] = self._nue[:n].astype(np.int16)
+        data["nunstable_imaginary_eigenvalues"] = self._nue_imag[:n].astype(np.int16)
         # save everything to the file
-        np.savez(filename, **data)
+        np.savez_compressed(filename, **data)
+
+
+def _count_array(counts) -> np.ndarray:
+    """Convert stored numbers of eigenvalues into an int array, with -1 for unknown (None)"""
+    counts = np.asarray(counts)
+    if counts.dtype == object:
+        # in older files, unknown numbers are stored as None
+        counts = np.array([-1 if n is None else n for n in counts])
+    return counts.astype(np.int32)
+
+
+def _cast_floats(val, dtype):
+    """Cast floating point arrays to the given dtype, leave everything else unchanged"""
+    if isinstance(val, np.ndarray) and np.issubdtype(val.dtype, np.floating):
+        return val.astype(dtype)
+    return val
 
 
 class BifurcationDiagram:
@@ -271,9 +557,9 @@ class BifurcationDiagram:
             p, norm = branch.data(only="bifurcations")
             ax.plot(p, norm, "*", color="C2")
             # annotate bifurcations with their types
-            for bif in branch.bifurcations():
-                s = bif.bifurcation_type()
-                ax.annotate(" "+s, (bif.p, bif.norm))
+            types = branch.bifurcation_types()
+            for i in np.flatnonzero(types != ""):
+                ax.annotate(" "+types[i], (branch._p[i], branch._norm[i]))
         ax.plot(np.nan, np.nan, "*", color="C2", label="bifurcations")
         ax.set_xlabel(self.parameter_name)
         ax.set_ylabel(self.norm_name)
@@ -285,12 +571,13 @@ class BifurcationDiagram:
         branch = self.new_branch(active=False)
         # load data dictionary from the file
         data = np.load(filename, allow_pickle=True)
-        # restore the solutions and their data
-        for i in range(len(data["norm"])):
-            sol = Solution()
-            sol.data = data["solution_data"][i]
-            sol.norm = data["norm"][i]
-            sol.p = data["p"][i]
-            sol.nunstable_eigenvalues = data["nunstable_eigenvalues"][i]
-            sol.nunstable_imaginary_eigenvalues = data["nunstable_imaginary_eigenvalues"][i]
-            branch.add_solution_point(sol)
+        # restore the arrays of the solutions' properties and their data at once,
+        # the Solution objects are only created when they are accessed
+        branch._p = np.array(data["p"], dtype=float)
+        branch._norm = np.array(data["norm"], dtype=float)
+        branch._nue = _count_array(data["nunstable_eigenvalues"])
+        branch._nue_imag = _count_array(data["nunstable_imaginary_eigenvalues"])
+        branch._snapshots = list(data["solution_data"])
+        for name in branch._known:
+            branch._known[name] = np.flatnonzero(getattr(branch, name) >= 0).tolist()
+        branch.solutions._extend_lazy(branch._p.size)
@@ -1,10 +1,11 @@
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
 import numpy as np
 import scipy.linalg
 import scipy.optimize
 import scipy.sparse as sp
 
+from .jit import newton_generator
 from .profiling import profile
 from .types import Matrix
 
@@ -38,8 +39,8 @@ class AbstractNewtonSolver:
         return self._iteration_count
 
     def norm(self, residuals) -> float:
-        """the norm used for checking the residuals for convergence"""
-        return np.max(residuals)
+        """the norm used for checking the residuals for convergence: the max. absolute residual"""
+        return np.max(np.abs(residuals))
 
     def throw_no_convergence_error(self, res=None):
         """throw an error when the solver failed to converge"""
@@ -64,17 +65,20 @@ class MyNewtonSolver(AbstractNewtonSolver):
         self._iteration_count = 0
         u = u0
         err = 0
+        # the residuals of the initial guess
+        res = f(u)
         while self._iteration_count < self.max_iterations:
             # do a classical Newton step
             J = jac(u)
             if sp.issparse(J):
-                du = sp.linalg.spsolve(J, f(u))
+                du = sp.linalg.spsolve(J, res)
             else:
-                du = np.linalg.solve(J, f(u))
+                du = np.linalg.solve(J, res)
             u -= du
             self._iteration_count += 1
-            # calculate the norm of the residuals
-            err = self.norm(f(u))
+            # calculate the norm of the residuals, the residuals are reused in the next step
+            res = f(u)
+            err = self.norm(res)
             # print some info on the step, if desired
             if self.verbosity > 1:
                 print(
@@ -93,7 +97,9 @@ class NewtonSolver(AbstractNewtonSolver):
     """
     A Newton solver that uses scipy.optimize.root for solving.
     The method (algorithm) to be used can be adjusted with the attribute 'method'.
-    NOTE: does not work with sparse Jacobians, but converts it to a dense matrix instead!
+    NOTE: scipy.optimize.root does not work with sparse Jacobians. Hence, if the Jacobian is
+    sparse, a classical Newton iteration with sparse LU solves is used instead
+    (unless 'sparse_newton' is set to False, then the Jacobian is converted to a dense matrix).
     """
 
     def __init__(self) -> None:
@@ -101,6 +107,8 @@ class NewtonSolver(AbstractNewtonSolver):
         #: choose from the different methods of scipy.optimize.root
         #: NOTE: method = "krylov" might be faster, but then we can use NewtonKrylovSolver directly
         self.method = "hybr"
+        #: use a Newton iteration with sparse linear solves if the Jacobian is sparse?
+        self.sparse_newton = True
 
     @profile
     def solve(self, f, u0, jac=None):
@@ -111,11 +119,18 @@ class NewtonSolver(AbstractNewtonSolver):
         if jac is None or self.method in inexact_methods:
             my_jac = None
         else:
+            # evaluate the Jacobian at the initial guess to check if it is sparse
+            J0 = jac(u0)
+            if sp.issparse(J0) and self.sparse_newton:
+                return self._solve_sparse(f, u0, jac, J0)
+            # the Jacobian at the initial guess is reused in the first call
+            J0_cache = [J0]
+
             def jac_wrapper(u):
                 # wrapper for the Jacobian
                 # sparse matrices are not supported by scipy's root method :-/ convert to dense
                 assert jac is not None
-                j = jac(u)
+                j = J0_cache.pop() if J0_cache else jac(u)
                 if sp.issparse(j):
                     return j.toarray()
                 return j
@@ -135,6 +150,52 @@ class NewtonSolver(AbstractNewtonSolver):
         # return the result vector
         return opt_result.x
 
+    def generate(self, rhs_kernel, jac_kernel) -> Callable:
+        """
+        Generate a solver for the system rhs_kernel(u, *args) = 0 with the dense Jacobian
+        jac_kernel(u, *args), where the whole Newton iteration is compiled with numba,
+        see bice.core.jit.newton_generator. The kernels must be supported by numba,
+        e.g., those of a JITEquation. Returns the function solve(u0, *args) -> u.
+        """
+        newton = newton_generator(rhs_kernel, jac_kernel)
+
+        def solve(u0, *args):
+            u, self._iteration_count, err = newton(
+                np.asarray(u0, dtype=np.float64), args, self.max_iterations,
+                self.convergence_tolerance)
+            if err >= self.convergence_tolerance:
+                self.throw_no_convergence_error(err)
+            if self.verbosity > 0:
+                print("NewtonSolver converged after",
+                      self._iteration_count, "iterations, error:", err)
+            return u
+        return solve
+
+    def _solve_sparse(self, f, u0, jac, J):
+        """Classical Newton iteration with sparse linear solves, J is the Jacobian at u0"""
+        self._iteration_count = 0
+        u = np.array(u0, copy=True)
+        res = f(u)
+        err = self.norm(res)
+        while err >= self.convergence_tolerance:
+            if self._iteration_count >= self.max_iterations:
+                self.throw_no_convergence_error(err)
+            # the Jacobian at the initial guess is already known
+            if self._iteration_count > 0:
+                J = jac(u)
+            u -= sp.linalg.spsolve(sp.csc_matrix(J), res)
+            self._iteration_count += 1
+            # the residuals are reused in the next step
+            res = f(u)
+            err = self.norm(res)
+            if self.verbosity > 1:
+                print(
+                    f"Newton step #{self._iteration_count}, max. residuals: {err:.2e}")
+        if self.verbosity > 0:
+            print("NewtonSolver converged after",
+                  self._iteration_count, "iterations, error:", err)
+        return u
+
 
 class NewtonKrylovSolver(AbstractNewtonSolver):
     """
@@ -162,8 +223,9 @@ class NewtonKrylovSolver(AbstractNewtonSolver):
         # increases performance of the krylov method
         if jac is not None and not self.approximate_jacobian:
             # compute incomplete LU decomposition of Jacobian
-            J_ilu = sp.linalg.spilu(sp.csc_matrix(jac(u0)))
-            M = sp.linalg.LinearOperator(shape=jac.shape, matvec=J_ilu.solve)
+            J0 = jac(u0)
+            J_ilu = sp.linalg.spilu(sp.csc_matrix(J0))
+            M = sp.linalg.LinearOperator(shape=J0.shape, matvec=J_ilu.solve)
             options.update({'jac_options': {'inner_M': M}})
 
         # solve!
@@ -200,6 +262,11 @@ class EigenSolver:
         self.latest_eigenvectors = None
         #: convergence tolerance of the eigensolver
         self.tol = 1e-8
+        #: number of eigenvalues that are computed with the iterative eigensolver, if
+        #: k=None is requested for a sparse matrix. Densifying a sparse matrix for a
+        #: direct eigensolver is very expensive. Set to None, to really compute all
+        #: eigenvalues with the direct eigensolver also for sparse matrices.
+        self.default_k = 50
 
     def solve(self, A: Matrix, M: Optional[Matrix] = None, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -207,10 +274,14 @@ class EigenSolver:
 
         If an unsigned integer `k` is given, the iterative eigensolver ARPACK will calculate
         the k first eigenvalues sorted by the largest real part. Otherwise a direct eigensolver
-        will be used to calculate all eigenvalues.
+        will be used to calculate all eigenvalues. If `A` is sparse and `k` is None, only
+        the first `self.default_k` eigenvalues are calculated with the iterative eigensolver.
 
         If a mass matrix `M` is given, the generalized eigenvalue A*x = v*M*x will be solved.
         """
+        if k is None and sp.issparse(A) and self.default_k is not None and A.shape[0] > 2:
+            # for sparse matrices, rather compute a limited number of eigenvalues iteratively
+            k = min(A.shape[0] - 2, self.default_k)
         if k is None:
             # if no number of values was specified, use a direct eigensolver for computing all eigenvalues
             A = A.toarray() if isinstance(A, sp.spmatrix) else A
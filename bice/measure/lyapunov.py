@@ -28,8 +28,8 @@ class LyapunovExponentCalculator():
         self.nintegration_steps = nintegration_steps
         #: cumulative variable for the total integration time
         self.T = 0
-        # storage for the perturbation vectors and the reference trajectory
-        self.perturbations: list = []
+        # storage for the perturbation vectors, one per row of the array
+        self.perturbations = np.empty((0, 0))
         self.generate_perturbation_vectors()
         # cumulative sum of the exponents, the actual exponents are calculated from sum / T
         self.__sum = np.zeros(nexponents)
@@ -42,37 +42,37 @@ class LyapunovExponentCalculator():
 
     # generate a new set of orthonormal perturbation vectors
     def generate_perturbation_vectors(self) -> None:
-        self.perturbations = [np.random.rand(self.problem.ndofs)
-                              for i in range(self.nexponents)]
+        self.perturbations = np.random.rand(self.nexponents, self.problem.ndofs)
         self.orthonormalize()
 
-    # orthonormalize the set of perturbation vectors using Gram-Schmidt-Orthonormalization
+    # orthonormalize the set of perturbation vectors, equivalent to Gram-Schmidt-Orthonormalization
     @profile
     def orthonormalize(self) -> np.ndarray:
-        # construct orthogonal vectors using Gram-Schmidt-method
-        for i in range(self.nexponents):
-            for j in range(i):
-                self.perturbations[i] -= self.perturbations[j] * \
-                    np.sum(self.perturbations[i]*self.perturbations[j]) / \
-                    np.sum(self.perturbations[j]*self.perturbations[j])
-        # normalize vectors and return each norm
-        norms = np.array([np.linalg.norm(t) for t in self.perturbations])
-        for i in range(self.nexponents):
-            self.perturbations[i] /= norms[i]
-        return norms
+        # the QR decomposition of the matrix of perturbation vectors (columns) yields the
+        # orthonormal vectors (Q) and the norms of the orthogonalized vectors (diagonal of R),
+        # in a single (BLAS-backed) call instead of a loop over all pairs of vectors
+        Q, R = np.linalg.qr(self.perturbations.T)
+        norms = np.diag(R)
+        # fix the signs, such that the vectors point in the same direction as with Gram-Schmidt
+        Q *= np.sign(norms)
+        self.perturbations = Q.T
+        # return each norm
+        return np.abs(norms)
 
     # integrate dt, reorthonormalize and update Lyapunov exponents
     @profile
     def step(self) -> None:
         # if the number of points changed, regenerate the perturbation vectors
-        if self.perturbations[0].size != self.problem.u.size:
+        if self.perturbations.shape[1] != self.problem.u.size:
             self.generate_perturbation_vectors()
         # load reference trajectory from problem, in case it has changed
         reference = self.problem.u.copy()
-        # generate perturbed trajectories from reference and perturbations
-        trajectories = [reference + ptb *
-                        self.epsilon for ptb in self.perturbations]
-        trajectories.append(reference)  # type: ignore
+        # generate perturbed trajectories from reference and perturbations,
+        # the last row is the reference trajectory
+        trajectories = np.empty((self.nexponents+1, reference.size), dtype=reference.dtype)
+        np.multiply(self.perturbations, self.epsilon, out=trajectories[:-1])
+        trajectories[:-1] += reference
+        trajectories[-1] = reference
         # integrate every trajectory, including reference
         time = float(self.problem.time)
         dt = self.problem.time_stepper.dt
@@ -83,11 +83,9 @@ class LyapunovExponentCalculator():
             self.problem.history.clear()
             for _ in range(self.nintegration_steps):
                 self.problem.time_step()
-            trajectories[i] = self.problem.u.copy()
+            trajectories[i] = self.problem.u
         # calculate new perturbation vectors from difference to reference
-        reference = trajectories[-1]
-        for i in range(self.nexponents):
-            self.perturbations[i] = trajectories[i] - reference
+        self.perturbations = trajectories[:-1] - trajectories[-1]
         # re-orthonormalize
         norms = self.orthonormalize()
         # add to total exponents sum and increment time
@@ -0,0 +1,165 @@
+"""
+Shared construction of periodic finite difference stencil matrices.
+"""
+from functools import lru_cache
+
+import numdifftools.fornberg as fornberg
+import numpy as np
+import scipy.sparse as sp
+
+from bice.core.jit import HAS_NUMBA, equation_kernel
+
+
+@lru_cache(maxsize=32)
+def central_stencil(derivative: int, order: int = 8) -> tuple:
+    """
+    Offsets and coefficients (for unit grid spacing) of the central finite difference stencil
+    of the given derivative and (even) approximation order, using Fornberg's (1988) algorithm.
+    A stencil of order 2 has 3 points, a stencil of order 8 has 9 points.
+    """
+    if order < 2 or order % 2 != 0:
+        raise ValueError("The approximation order of central stencils has to be even.")
+    # the number of points has to be odd and large enough for the derivative
+    width = order // 2 + (derivative - 1) // 2
+    offsets = np.arange(-width, width+1)
+    coeffs = fornberg.fd_weights(offsets.astype(float), 0, n=derivative)
+    # enforce the exact (anti)symmetry of the central stencil, e.g. zero central coefficients
+    # for odd derivatives, that would otherwise suffer from roundoff
+    coeffs = (coeffs + (-1)**derivative * coeffs[::-1]) / 2
+    offsets.flags.writeable = False
+    coeffs.flags.writeable = False
+    return offsets, coeffs
+
+
+#: offsets of the 9-point central stencils (8th order)
+STENCIL_OFFSETS = central_stencil(1, 8)[0]
+#: coefficients of the 8th order central FD stencil for the first derivative (times dx)
+NABLA_COEFFS = central_stencil(1, 8)[1]
+#: coefficients of the 8th order central FD stencil for the second derivative (times dx^2)
+LAPLACE_COEFFS = central_stencil(2, 8)[1]
+
+
+def periodic_stencil_matrix(coeffs: np.ndarray, offsets: np.ndarray, N: int) -> sp.csr_matrix:
+    """
+    Build the (N x N) circulant matrix of a stencil with the given coefficients and offsets,
+    i.e., (A*u)_i = sum_k coeffs[k] * u_{(i + offsets[k]) mod N}
+    """
+    # drop zero coefficients, they would only add explicit zeros to the matrix
+    nonzero = coeffs != 0
+    coeffs, offsets = coeffs[nonzero], offsets[nonzero]
+    rows = np.tile(np.arange(N), len(offsets))
+    cols = (rows + np.repeat(offsets, N)) % N
+    data = np.repeat(coeffs, N)
+    # duplicate entries (for stencils wider than the domain) are summed up
+    return sp.csr_matrix((data, (rows, cols)), shape=(N, N))
+
+
+@lru_cache(maxsize=16)
+def _build_nabla_laplace(N: int, dx: float, order: int) -> tuple:
+    offsets, coeffs = central_stencil(1, order)
+    nabla = periodic_stencil_matrix(coeffs / dx, offsets, N)
+    offsets, coeffs = central_stencil(2, order)
+    laplace = periodic_stencil_matrix(coeffs / dx**2, offsets, N)
+    return nabla, laplace
+
+
+def build_nabla_laplace(N: int, dx: float, order: int = 8) -> tuple:
+    """
+    Build the periodic central FD matrices (nabla, laplace) of the given approximation order
+    for N uniformly spaced grid points with spacing dx. The matrices are cached for repeated
+    calls with the same grid, copies are returned so that the cache cannot be modified by accident.
+    Lower orders give narrower stencils, e.g. order=2 for 3-point stencils on very large grids.
+    """
+    nabla, laplace = _build_nabla_laplace(int(N), float(dx), int(order))
+    return nabla.copy(), laplace.copy()
+
+
+def apply_periodic_stencil(u: np.ndarray, coeffs: np.ndarray,
+                           offsets: np.ndarray = STENCIL_OFFSETS,
+                           out: np.ndarray = None) -> np.ndarray:
+    """
+    Apply a periodic stencil along the first axis of u, i.e.,
+    result_i = sum_k coeffs[k] * u_{(i + offsets[k]) mod N},
+    which equals periodic_stencil_matrix(coeffs, offsets, N).dot(u) without the generic
+    sparse matrix product. Uses a compiled kernel, if numba is available.
+    Optionally, the result is written into a preallocated array 'out' of the shape of u.
+    """
+    N = u.shape[0]
+    dtype = np.result_type(u.dtype, coeffs.dtype)
+    if out is None or out.shape != u.shape or out.dtype != dtype or not out.flags.c_contiguous:
+        result = np.empty(u.shape, dtype=dtype)
+    else:
+        result = out
+    offsets = np.asarray(offsets, dtype=np.int64)
+    u = np.ascontiguousarray(u)
+    if HAS_NUMBA and u.ndim == 1 and not np.iscomplexobj(result):
+        _apply_periodic_stencil_kernel_1d(u, coeffs, offsets, result)
+    elif HAS_NUMBA:
+        # treat all trailing dimensions as a batch of vectors
+        _apply_periodic_stencil_kernel(u.reshape((N, -1)), coeffs, offsets,
+                                       result.reshape((N, -1)))
+    else:
+        _apply_periodic_stencil_numpy(u.reshape((N, -1)), coeffs, offsets,
+                                      result.reshape((N, -1)))
+    if out is not None and result is not out:
+        out[...] = result
+        return out
+    return result
+
+
+# NOTE: the modulo of the periodic wrap-around is only needed for the points within the
+#       stencil width of the boundaries, the interior points address u directly.
+#       The 1d kernel accumulates each point in a (real) scalar.
+
+
+@equation_kernel
+def _apply_periodic_stencil_kernel_1d(u, coeffs, offsets, out):
+    N = u.size
+    w = 0
+    for k in range(offsets.size):
+        w = max(w, abs(offsets[k]))
+    for i in range(N):
+        acc = 0.
+        if w <= i < N - w:
+            for k in range(coeffs.size):
+                acc += coeffs[k] * u[i + offsets[k]]
+        else:
+            for k in range(coeffs.size):
+                acc += coeffs[k] * u[(i + offsets[k]) % N]
+        out[i] = acc
+
+
+@equation_kernel
+def _apply_periodic_stencil_kernel(u, coeffs, offsets, out):
+    N, M = u.shape
+    w = 0
+    for k in range(offsets.size):
+        w = max(w, abs(offsets[k]))
+    for i in range(N):
+        row = out[i]
+        row[:] = 0
+        interior = w <= i < N - w
+        for k in range(coeffs.size):
+            c = coeffs[k]
+            src = u[i + offsets[k]] if interior else u[(i + offsets[k]) % N]
+            for j in range(M):
+                row[j] += c * src[j]
+
+
+def _apply_periodic_stencil_numpy(u, coeffs, offsets, out):
+    N = u.shape[0]
+    w = int(np.max(np.abs(offsets)))
+    out.fill(0)
+    if w > N:
+        # stencil wider than the domain: use (slower) rolled copies
+        for c, k in zip(coeffs, offsets):
+            out += c * np.roll(u, -k, axis=0)
+        return
+    # pad with periodic ghost points, then each term is a shifted view of the padded array,
+    # that is scaled into a reused buffer and accumulated without further temporaries
+    u_pad = np.concatenate((u[N-w:], u, u[:w]))
+    tmp = np.empty_like(out)
+    for c, k in zip(coeffs, offsets):
+        if c != 0:
+            np.multiply(u_pad[w+k:w+k+N], c, out=tmp)
+            out += tmp
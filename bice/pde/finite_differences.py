@@ -8,10 +8,17 @@ import numpy as np
 import scipy.sparse as sp
 
 from bice.core import profile
+from bice.core.jit import HAS_NUMBA, equation_kernel
 from bice.core.types import Array, Matrix, Shape
 
 from .pde import PartialDifferentialEquation
 
+try:
+    # low-level sparse matrix-vector product, that writes into a given output array
+    from scipy.sparse._sparsetools import csr_matvec
+except ImportError:
+    csr_matvec = None
+
 
 class FiniteDifferencesEquation(PartialDifferentialEquation):
     """
@@ -35,6 +42,20 @@ class FiniteDifferencesEquation(PartialDifferentialEquation):
             self.x = [np.linspace(0, 1, self.shape[-1], endpoint=False)]
         #: the boundary conditions, if None, defaults to periodic BCs
         self.bc = None
+        #: Use FFTs for du_dx on uniform periodic grids? The periodic FD operator is a circulant
+        #: matrix, that can be applied with O(N log N) FFTs. Pays off for large N only.
+        self.use_fft = False
+        #: Bandwidth of the Jacobian, i.e., the number of neighboring unknowns (on each side)
+        #: that the rhs of an unknown depends on, typically the stencil width (times the number of
+        #: nested derivatives). If set, the FD Jacobian only perturbs non-overlapping columns
+        #: simultaneously (graph coloring) and requires only ~(2*bandwidth+1) rhs evaluations.
+        #: The bandwidth refers to the flattened unknowns, so it is best suited for scalar fields.
+        self.jacobian_bandwidth = None
+        # cache for the banded sparsity pattern of the Jacobian: ((N, bandwidth, periodic), pattern)
+        self._jacobian_sparsity = None
+        # Fourier multipliers of the circulant nabla operator, if use_fft is active
+        self._nabla_hat = None
+        self._fft_size = 0
         # mesh adaption settings
         #: mesh adaption: maximum error tolerance
         self.max_refinement_error = 1e-0
@@ -139,13 +160,56 @@ class FiniteDifferencesEquation(PartialDifferentialEquation):
         self.nabla = self.ddx[1]
         # laplace operator: d^2 / dx^2
         self.laplace = self.ddx[2]
+        # for uniform periodic grids, the nabla operator is circulant: store its Fourier multipliers
+        self._fft_size = 0
+        if self.use_fft and isinstance(self.bc, PeriodicBC) and N > 1:
+            dx = np.append(np.diff(x), self.bc.boundary_dx)
+            if np.allclose(dx, dx[0]):
+                self._fft_size = N
+        self._nabla_hat = self.circulant_multipliers(self.nabla.Q)
         # return the resulting list of FD matrices
         return self.ddx
 
-    def jacobian(self, u) -> Matrix:
+    def circulant_multipliers(self, A: Matrix) -> Optional[Array]:
+        """
+        The Fourier multipliers A_hat of a (circulant) operator A on the uniform periodic grid,
+        e.g. of nabla, laplace or combinations thereof, such that A*u = irfft(A_hat * rfft(u)).
+        Applies several operators with a single pair of FFTs, by combining their multipliers.
+        Returns None, unless use_fft is active and the grid is uniform and periodic.
+        """
+        if self._fft_size == 0 or A.shape != (self._fft_size, self._fft_size):
+            return None
+        return circulant_multipliers(A)
+
+    def jacobian(self, u, use_central_differences: bool = False,
+                 sparsity: Optional[Matrix] = None, f0: Optional[Array] = None) -> Matrix:
         """Jacobian of the equation"""
+        # use the banded sparsity pattern, if the bandwidth of the Jacobian is known
+        if sparsity is None and self.jacobian_bandwidth is not None:
+            sparsity = self.banded_jacobian_sparsity(u.size)
         # FD Jacobians are typically sparse, so we convert to a sparse matrix
-        return sp.csr_matrix(super().jacobian(u))
+        return sp.csr_matrix(super().jacobian(u, use_central_differences, sparsity, f0))
+
+    def banded_jacobian_sparsity(self, N: int) -> sp.csr_matrix:
+        """
+        Sparsity pattern of a banded (N x N) Jacobian with bandwidth self.jacobian_bandwidth,
+        wrapping around the boundaries in case of periodic boundary conditions
+        """
+        bw = self.jacobian_bandwidth
+        periodic = isinstance(self.bc, PeriodicBC)
+        key = (N, bw, periodic)
+        # the pattern is cached, so that the coloring of its columns is cached as well
+        if self._jacobian_sparsity is not None and self._jacobian_sparsity[0] == key:
+            return self._jacobian_sparsity[1]
+        offsets = np.arange(-min(bw, N-1), min(bw, N-1)+1)
+        if periodic:
+            # wrapped diagonals, that couple the unknowns across the periodic boundary
+            wrapped = offsets - np.sign(offsets) * N
+            offsets = np.union1d(offsets, wrapped[(wrapped != 0) & (np.abs(wrapped) < N)])
+        pattern = sp.diags([np.ones(N - abs(k)) for k in offsets], offsets,
+                           shape=(N, N), format="csr", dtype=bool)
+        self._jacobian_sparsity = (key, pattern)
+        return pattern
 
     # TODO: support higher dimensions than 1d
     @profile
@@ -222,13 +286,24 @@ class FiniteDifferencesEquation(PartialDifferentialEquation):
             err += np.abs(curv*dx)
         return err
 
-    def du_dx(self, u: Array, direction: int = 0) -> Array:
-        """Default implementation for spatial derivative"""
+    def du_dx(self, u: Array, direction: int = 0, out: Optional[Array] = None) -> Array:
+        """
+        Default implementation for spatial derivative.
+        Optionally, the result is written into a preallocated array 'out',
+        e.g., to reuse a buffer in subsequent calls of rhs(u).
+        """
         assert self.nabla is not None
+        if self._nabla_hat is not None and u.shape == (self._fft_size,) and np.isrealobj(u):
+            # FFT-based derivative for uniform periodic grids
+            du = np.fft.irfft(self._nabla_hat * np.fft.rfft(u), n=u.size)
+            if out is None:
+                return du
+            out[...] = du
+            return out
         if self.spatial_dimension == 1:  # 1d case
             assert isinstance(self.nabla, AffineOperator)
-            return self.nabla(u)
-        return self.nabla[direction].dot(u)
+            return self.nabla(u, out=out)
+        return sparse_matvec(self.nabla[direction], u, out=out)
 
     def save(self) -> dict:
         """
@@ -261,10 +336,12 @@ class AffineOperator:
         #: constant (affine) part
         self.G = G
 
-    def __call__(self, u=None, g=1):
+    def __call__(self, u=None, g=1, out=None):
         """
         Apply the operator to some vector/tensor u and scale the constant part with g:
         operator(u) = Q*u + g*G
+        for vectors u, the result may be written into a preallocated array 'out',
+        which avoids the allocation of temporary arrays
         if called without arguments, only the linear part is returned, for an intuitive
         implementation of operator derivatives, e.g.:
         f(u) = operator(u) = Q*u + g*G
@@ -278,13 +355,23 @@ class AffineOperator:
         # check if u is not a vector (but a matrix or tensor)
         # make sure that a sparse matrix is returned
         if u.ndim > 1:
+            # for sparse u and a vanishing constant part, avoid building a dense
+            # (all zero) matrix of the shape of u
+            if sp.issparse(u) and self.is_linear():
+                return sp.csr_matrix(self.Q.dot(u))
             return self.Q.dot(u) + sp.coo_matrix(g*np.resize(self.G, u.shape))
         # else, u is a vector, simply perform the Q*u + G
-        return self.Q.dot(u) + g*self.G
-
-    def dot(self, u):
+        if out is None:
+            return sparse_matvec(self.Q, u) + g*self.G
+        sparse_matvec(self.Q, u, out=out)
+        # adding the constant part is cheaper than checking whether it vanishes
+        if not (np.isscalar(self.G) and self.G == 0):
+            out += self.G if g == 1 else g*self.G
+        return out
+
+    def dot(self, u, out=None):
         """Overloaded dot method, so we can do operator.dot(u) as with numpy/scipy matrices"""
-        return self.__call__(u)
+        return self.__call__(u, out=out)
 
     def is_linear(self):
         """
@@ -293,6 +380,54 @@ class AffineOperator:
         return not np.any(self.G)  # checks if all entries of G are zero
 
 
+def sparse_matvec(A: Matrix, x: Array, out: Optional[Array] = None) -> Array:
+    """
+    Matrix-vector product A*x with a (sparse) matrix A, optionally written into
+    a preallocated array 'out'. For CSR matrices, the product is accumulated directly
+    into 'out', without allocating an intermediate result. If numba is available,
+    the product of CSR matrices and vectors is computed by a compiled kernel, which
+    avoids the overhead of scipy's dispatch for the small matrices of 1d problems.
+    """
+    is_csr = sp.issparse(A) and A.format == "csr"
+    if HAS_NUMBA and is_csr and isinstance(x, np.ndarray) and x.shape == (A.shape[1],) \
+            and A.dtype == np.float64 and x.dtype == np.float64:
+        if out is None:
+            out = np.empty(A.shape[0])
+        if out.shape == (A.shape[0],) and out.dtype == np.float64:
+            _csr_matvec_kernel(A.indptr, A.indices, A.data, x, out)
+            return out
+    if out is None:
+        return A.dot(x)
+    if csr_matvec is not None and is_csr \
+            and out.dtype == np.result_type(A.dtype, x.dtype) and out.flags.c_contiguous:
+        out.fill(0)
+        csr_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data,
+                   np.ascontiguousarray(x).ravel(), out.ravel())
+    else:
+        out[...] = A.dot(x)
+    return out
+
+
+@equation_kernel
+def _csr_matvec_kernel(indptr, indices, data, x, out):
+    # row-wise product of the CSR matrix (indptr, indices, data) with the vector x
+    for i in range(out.size):
+        s = 0.
+        for j in range(indptr[i], indptr[i+1]):
+            s += data[j] * x[indices[j]]
+        out[i] = s
+
+
+def circulant_multipliers(A: Matrix) -> Array:
+    """
+    The Fourier multipliers of a circulant (N x N) matrix A, i.e., the rfft of its first column,
+    such that A*u = irfft(A_hat * rfft(u), n=N)
+    """
+    column = A[:, 0]
+    column = column.toarray() if sp.issparse(column) else np.asarray(column)
+    return np.fft.rfft(column.ravel())
+
+
 class FDBoundaryConditions:
     """
     Boundary conditions for FD are applied using an affine transformation Q*u + G that maps the
@@ -1,8 +1,9 @@
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
 
-from bice.core.types import Shape
+from bice.core.types import Array, Shape
 
 from .pde import PartialDifferentialEquation
 
@@ -24,53 +25,54 @@ class PseudospectralEquation(PartialDifferentialEquation):
         #: the wavevector
         self.k = None
         self.ksquare = None
+        # were the k-vectors built for real FFTs (rfft)?
+        self._real_fft = False
 
-    def build_kvectors(self, real_fft: bool = False) -> None:
+    def build_kvectors(self, real_fft: bool = False, dtype=np.float64) -> None:
         """
         Build the k-vectors for the Fourier space
         set real=True, if real input to the FFT can be assumed (rfft)
         (the k-vectors will be smaller and rfft is more performant than fft)
+        In higher dimensions, the k-vectors are sparse grids (e.g. of shapes (1, Nx) and (Ny, 1)),
+        that broadcast to the full grid. Only ksquare is stored on the full grid.
+        The dtype may be reduced, e.g. to np.float32 for single-precision FFTs, to save memory.
+        The k-vectors are shared (read-only) between equations with the same grid.
         """
         assert self.x is not None
-        if len(self.x) == 1:
-            Lx = self.x[0][-1] - self.x[0][0]
-            Nx = self.x[0].size
-            # the fourier space
-            if real_fft:
-                self.k = [np.fft.rfftfreq(Nx, Lx / (2. * Nx * np.pi))]
-            else:
-                self.k = [np.fft.fftfreq(Nx, Lx / (2. * Nx * np.pi))]
-            self.ksquare = self.k[0]**2
-        elif len(self.x) == 2:
-            Lx = self.x[0][-1] - self.x[0][0]
-            Nx = self.x[0].size
-            Ly = self.x[1][-1] - self.x[1][0]
-            Ny = self.x[1].size
-            # the fourier space
-            if real_fft:
-                kx = np.fft.rfftfreq(Nx, Lx / (2. * Nx * np.pi))
-            else:
-                kx = np.fft.fftfreq(Nx, Lx / (2. * Nx * np.pi))
-            ky = np.fft.fftfreq(Ny, Ly / (2. * Ny * np.pi))
-            kx, ky = np.meshgrid(kx, ky)
-            self.k = [kx, ky]
-            self.ksquare = kx**2 + ky**2
-        elif len(self.x) == 3:
-            Lx = self.x[0][-1] - self.x[0][0]
-            Nx = self.x[0].size
-            Ly = self.x[1][-1] - self.x[1][0]
-            Ny = self.x[1].size
-            Lz = self.x[2][-1] - self.x[2][0]
-            Nz = self.x[2].size
-            # the fourier space
-            if real_fft:
-                kx = np.fft.rfftfreq(Nx, Lx / (2. * Nx * np.pi))
-            else:
-                kx = np.fft.fftfreq(Nx, Lx / (2. * Nx * np.pi))
-            ky = np.fft.fftfreq(Ny, Ly / (2. * Ny * np.pi))
-            kz = np.fft.fftfreq(Nz, Lz / (2. * Nz * np.pi))
-            kx, ky, kz = np.meshgrid(kx, ky, kz)
-            self.k = [kx, ky, kz]
-            self.ksquare = kx**2 + ky**2 + kz**2
+        self._real_fft = real_fft
+        # number of grid points and domain lengths in each spatial dimension
+        Ns = tuple(x.size for x in self.x)
+        Ls = tuple(float(x[-1] - x[0]) for x in self.x)
+        k, self.ksquare = _make_kgrid(Ns, Ls, real_fft, np.dtype(dtype))
+        self.k = list(k)
 
-    # TODO: implement a default du_dx method?
+    def du_dx(self, u: Array, direction: int = 0) -> Array:
+        """
+        Default implementation for the spatial derivative, using the spectral
+        derivative in Fourier space: du/dx = iFFT(i*k*FFT(u))
+        """
+        assert self.k is not None, "The k-vectors need to be built with build_kvectors() first."
+        k = self.k[direction]
+        if self._real_fft:
+            return np.fft.irfftn(1j * k * np.fft.rfftn(u), s=u.shape)
+        du = np.fft.ifftn(1j * k * np.fft.fftn(u))
+        return np.real(du) if np.isrealobj(u) else du
+
+
+@lru_cache(maxsize=8)
+def _make_kgrid(Ns: tuple, Ls: tuple, real_fft: bool, dtype: np.dtype) -> tuple:
+    """Build the (read-only) k-vectors and ksquare for a grid with Ns points and lengths Ls"""
+    # the fourier space
+    ks = []
+    for d, (N, L) in enumerate(zip(Ns, Ls)):
+        if real_fft and d == 0:
+            ks.append(np.fft.rfftfreq(N, L / (2. * N * np.pi)).astype(dtype))
+        else:
+            ks.append(np.fft.fftfreq(N, L / (2. * N * np.pi)).astype(dtype))
+    if len(ks) > 1:
+        ks = np.meshgrid(*ks, sparse=True)
+    ksquare = sum(k**2 for k in ks)
+    # the arrays are shared between equations, so they must not be modified
+    for arr in [*ks, ksquare]:
+        arr.flags.writeable = False
+    return tuple(ks), ksquare
@@ -2,8 +2,11 @@ from typing import TYPE_CHECKING
 
 import numpy as np
 import scipy.integrate
+import scipy.linalg
+import scipy.sparse as sp
+import scipy.sparse.linalg
 
-from .time_steppers import TimeStepper
+from .time_steppers import TimeStepper, _mass_matrix_diagonal
 
 if TYPE_CHECKING:
     from bice.core.problem import Problem
@@ -17,6 +20,22 @@ class BDF2(TimeStepper):
     def __init__(self, dt: float = 1e-3) -> None:
         super().__init__(dt)
         self.order = 2
+        # cache for the mass matrix M and the matrix 3*M of the Jacobian, as long as M is the same
+        self._M = None
+        self._M3 = None
+        # the diagonal of 3*M, if M is a diagonal matrix
+        self._M3_diag = None
+        #: Reuse the factorized Jacobian of the implicit system for up to this many steps
+        #: (modified Newton method, cf. CVODE). The factorization is renewed if dt, the mass
+        #: matrix or the number of unknowns changed, or if the Newton iteration converges poorly.
+        #: If 0, the problem's Newton solver is used with a new Jacobian in every iteration.
+        self.max_jacobian_age = 0
+        #: renew a reused Jacobian if the residuals decrease by less than this factor per iteration
+        self.jacobian_renewal_rate = 0.3
+        # the solve function of the factorized Jacobian, the (dt, size) it belongs to, its age
+        self._jac_solve = None
+        self._jac_key = None
+        self._jac_age = 0
 
     def step(self, problem: 'Problem') -> None:
         # advance in time
@@ -27,16 +46,79 @@ class BDF2(TimeStepper):
         u_2 = problem.history.u(1) if problem.history.length > 1 else u_1
         # obtain the problem's mass matrix
         M = problem.mass_matrix()
+        # the mass matrix is usually constant, so 3*M needs to be recomputed only if it changed
+        if M is not self._M:
+            self._M = M
+            self._M3 = 3*M
+            M_diag = _mass_matrix_diagonal(M)
+            self._M3_diag = None if M_diag is None else 3*M_diag
+            self._jac_solve = None
+        M3 = self._M3
+        M3_diag = self._M3_diag
+        # the history part of M*(3*u - 4*u_1 + u_2) is constant during the step
+        M_hist = M.dot(4*u_1 - u_2)
 
         def f(u):
-            # assemble the system
-            return self.dt * problem.rhs(u) - M.dot(3*u - 4*u_1 + u_2)
+            # assemble the system: dt*rhs(u) - 3*M*u + M*(4*u_1 - u_2)
+            rhs = problem.rhs(u)
+            self._store_rhs(u, rhs)
+            res = self.dt * rhs
+            res -= M3.dot(u) if M3_diag is None else M3_diag * u
+            res += M_hist
+            return res
 
         def J(u):
             # Jacobian of the system
-            return self.dt * problem.jacobian(u) - 3*M
+            return self.dt * problem.jacobian(u) - M3
         # solve it with a Newton solver
-        problem.u = problem.newton_solver.solve(f, problem.u, J)
+        if self.max_jacobian_age > 0:
+            problem.u = self._solve_modified_newton(problem, f, J)
+        else:
+            problem.u = problem.newton_solver.solve(f, problem.u, J)
+        self._validate_rhs(problem.u)
+
+    def _solve_modified_newton(self, problem: 'Problem', f, J):
+        """
+        Newton iteration for f(u) = 0 that reuses the factorized Jacobian J of previous steps,
+        with the convergence tolerance and maximum iterations of the problem's Newton solver
+        """
+        solver = problem.newton_solver
+        u = np.array(problem.u, copy=True)
+        # renew the factorization if it is too old or belongs to a different system
+        fresh = self._jac_solve is None or self._jac_key != (self.dt, u.size) or \
+            self._jac_age >= self.max_jacobian_age
+        if fresh:
+            self._factorize_jacobian(J(u), u.size)
+        self._jac_age += 1
+        res = f(u)
+        err = np.max(np.abs(res))
+        niterations = 0
+        while err >= solver.convergence_tolerance:
+            if niterations >= solver.max_iterations:
+                raise np.linalg.LinAlgError(
+                    f"BDF2 Newton iteration did not converge after {niterations} iterations! "
+                    f"Max. residuals: {err:.2e}")
+            u -= self._jac_solve(res)
+            niterations += 1
+            res_new = f(u)
+            err_new = np.max(np.abs(res_new))
+            # poor convergence with a reused Jacobian: renew it at the current iterate
+            if not fresh and not err_new < self.jacobian_renewal_rate * err:
+                self._factorize_jacobian(J(u), u.size)
+                self._jac_age = 1
+                fresh = True
+            res, err = res_new, err_new
+        return u
+
+    def _factorize_jacobian(self, J, size: int) -> None:
+        """LU factorization of the (sparse or dense) Jacobian J for reuse in later solves"""
+        if sp.issparse(J):
+            self._jac_solve = scipy.sparse.linalg.splu(sp.csc_matrix(J)).solve
+        else:
+            lu = scipy.linalg.lu_factor(J)
+            self._jac_solve = lambda b: scipy.linalg.lu_solve(lu, b)
+        self._jac_key = (self.dt, size)
+        self._jac_age = 0
 
 
 class BDF(TimeStepper):
@@ -15,13 +15,29 @@ class RungeKutta4(TimeStepper):
 
     # perform timestep
     def step(self, problem: 'Problem') -> None:
-        k1 = problem.rhs(problem.u)
+        # NOTE: the stage vectors are combined with in-place operations, so that each
+        #       combination allocates only a single temporary array
+        u = problem.u
+        k1 = problem.rhs(u)
         problem.time += self.dt/2.
-        k2 = problem.rhs(problem.u + self.dt / 2 * k1)
-        k3 = problem.rhs(problem.u + self.dt / 2 * k2)
+        tmp = k1 * (self.dt / 2)
+        tmp += u
+        k2 = problem.rhs(tmp)
+        tmp = k2 * (self.dt / 2)
+        tmp += u
+        k3 = problem.rhs(tmp)
         problem.time += self.dt/2.
-        k4 = problem.rhs(problem.u + self.dt * k3)
-        problem.u += self.dt / 6. * (k1 + 2 * k2 + 2 * k3 + k4)
+        tmp = k3 * self.dt
+        tmp += u
+        k4 = problem.rhs(tmp)
+        # u + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
+        tmp = k2 + k3
+        tmp *= 2
+        tmp += k1
+        tmp += k4
+        tmp *= self.dt / 6.
+        tmp += u
+        problem.u = tmp
 
 
 # Runge-Kutta-Fehlberg-4-5 scheme with adaptive step size
@@ -87,21 +103,23 @@ class RungeKuttaFehlberg45(TimeStepper):
     def step(self, problem: 'Problem') -> None:
         # Store evaluation values
         t = problem.time
-        k1 = self.dt * problem.rhs(problem.u)
+        # the unknowns are fetched only once, since this may involve a concatenation
+        u = problem.u
+        k1 = self.dt * problem.rhs(u)
         problem.time = t + self._a2 * self.dt
-        k2 = self.dt * problem.rhs(problem.u + self._b21 * k1)
+        k2 = self.dt * problem.rhs(u + self._b21 * k1)
         problem.time = t + self._a3 * self.dt
-        k3 = self.dt * problem.rhs(problem.u +
+        k3 = self.dt * problem.rhs(u +
                                    self._b31 * k1 + self._b32 * k2)
         problem.time = t + self._a4 * self.dt
         k4 = self.dt * \
-            problem.rhs(problem.u + self._b41 * k1 +
+            problem.rhs(u + self._b41 * k1 +
                         self._b42 * k2 + self._b43 * k3)
         problem.time = t + self._a5 * self.dt
-        k5 = self.dt * problem.rhs(problem.u + self._b51 *
+        k5 = self.dt * problem.rhs(u + self._b51 *
                                    k1 + self._b52 * k2 + self._b53 * k3 + self._b54 * k4)
         problem.time = t + self._a6 * self.dt
-        k6 = self.dt * problem.rhs(problem.u + self._b61 * k1 + self._b62 *
+        k6 = self.dt * problem.rhs(u + self._b61 * k1 + self._b62 *
                                    k2 + self._b63 * k3 + self._b64 * k4 + self._b65 * k5)
 
         # Calulate local truncation error
@@ -119,7 +137,7 @@ class RungeKuttaFehlberg45(TimeStepper):
         if eps <= self.error_tolerance:
             # update problem variables
             problem.time = t + dt_old
-            problem.u += self._c1 * k1 + self._c3 * k3 + self._c4 * k4 + self._c5 * k5
+            problem.u = u + (self._c1 * k1 + self._c3 * k3 + self._c4 * k4 + self._c5 * k5)
             # reset rejection count
             self.rejection_count = 0
         elif self.rejection_count < self.max_rejections:
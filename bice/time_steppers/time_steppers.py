@@ -1,6 +1,9 @@
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+import scipy.sparse as sp
+
 if TYPE_CHECKING:
     from bice.core.problem import Problem
 
@@ -15,6 +18,12 @@ class TimeStepper:
     def __init__(self, dt: float = 1e-2) -> None:
         #: the time step size
         self.dt = dt
+        #: the right-hand side at the new state, if it was evaluated anyway during the
+        #: last step (otherwise None). Only valid directly after the step, e.g., for
+        #: measuring the norm of du/dt without another evaluation of the rhs.
+        self.last_rhs = None
+        # the unknowns at which the stored rhs was evaluated
+        self._last_rhs_u = None
 
     # # calculate the time derivative of the unknowns for a given problem
     # def get_dudt(self, problem, u):
@@ -26,6 +35,39 @@ class TimeStepper:
         raise NotImplementedError(
             "'TimeStepper' is an abstract base class - do not use for actual time-stepping!")
 
+    def _store_rhs(self, u, rhs) -> None:
+        """store the rhs that was evaluated at the unknowns u, e.g. by the Newton solver"""
+        self.last_rhs = rhs
+        self._last_rhs_u = u.copy()
+
+    def _validate_rhs(self, u) -> None:
+        """keep the stored rhs only if it was evaluated at the new unknowns u"""
+        if self._last_rhs_u is None or not np.array_equal(self._last_rhs_u, u):
+            self.last_rhs = None
+            self._last_rhs_u = None
+
+    def current_rhs(self, problem: 'Problem'):
+        """
+        The right-hand side at the problem's current unknowns, e.g., for the norm of du/dt
+        in a time loop. Reuses last_rhs, if it was evaluated at the current unknowns during
+        the last step, otherwise the rhs is evaluated. Only call this directly after the step,
+        i.e., before any parameters are changed.
+        """
+        u = problem.u
+        if self.last_rhs is not None and np.array_equal(self._last_rhs_u, u):
+            return self.last_rhs
+        return problem.rhs(u)
+
+
+def _mass_matrix_diagonal(M):
+    """
+    The diagonal of the mass matrix M as a vector, if M is a diagonal matrix (e.g. the identity),
+    otherwise None. Products with a diagonal matrix are cheaper as elementwise products.
+    """
+    d = M.diagonal()
+    nnz = M.count_nonzero() if sp.issparse(M) else np.count_nonzero(M)
+    return d if nnz == np.count_nonzero(d) else None
+
 
 class Euler(TimeStepper):
     """
@@ -43,19 +85,47 @@ class ImplicitEuler(TimeStepper):
     Implicit Euler scheme
     """
 
+    def __init__(self, dt: float = 1e-2) -> None:
+        super().__init__(dt)
+        # cache for the matrix M/dt, as long as the mass matrix M and dt are the same
+        self._M = None
+        self._M_dt = None
+        self._M_dt_key = None
+        # the diagonal of M/dt, if M is a diagonal matrix
+        self._M_dt_diag = None
+
     def step(self, problem: 'Problem') -> None:
         # advance in time
         problem.time += self.dt
-        # obtain the mass matrix
+        # obtain the mass matrix, M/dt needs to be recomputed only if M or dt changed
         M = problem.mass_matrix()
+        if M is not self._M or self.dt != self._M_dt_key:
+            self._M = M
+            self._M_dt = M / self.dt
+            self._M_dt_key = self.dt
+            M_diag = _mass_matrix_diagonal(M)
+            self._M_dt_diag = None if M_diag is None else M_diag / self.dt
+        M_dt = self._M_dt
+        M_dt_diag = self._M_dt_diag
+        # the history part of M*(u - u_old)/dt is constant during the step
+        M_dt_u_old = M_dt.dot(problem.u)
 
         def f(u):
-            # assemble the system
-            return problem.rhs(u) - M.dot(u - problem.u) / self.dt
+            # assemble the system: rhs(u) - M*u/dt + M*u_old/dt
+            rhs = problem.rhs(u)
+            self._store_rhs(u, rhs)
+            if M_dt_diag is None:
+                res = rhs - M_dt.dot(u)
+            else:
+                res = M_dt_diag * u
+                np.subtract(rhs, res, out=res)
+            res += M_dt_u_old
+            return res
 
         def J(u):
             # Jacobian of the system
-            return problem.jacobian(u) - M / self.dt
+            return problem.jacobian(u) - M_dt
         # solve it with a Newton solver
         # TODO: detect if Newton solver failed and reject step
         problem.u = problem.newton_solver.solve(f, problem.u, J)
+        self._validate_rhs(problem.u)
@@ -6,6 +6,7 @@ import os
 from bice import Problem, time_steppers
 from bice.pde import PseudospectralEquation
 from bice.continuation import TranslationConstraint, VolumeConstraint
+from bice.continuation.constraints import trapezoid
 
 
 class CahnHilliardEquation(PseudospectralEquation):
@@ -98,7 +99,7 @@ if not os.path.exists("initial_state.npz"):
         # perform dealiasing
         problem.dealias()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             break
@@ -117,7 +118,7 @@ translation_constraint = TranslationConstraint(problem.che)
 problem.add_equation(translation_constraint)
 problem.volume_constraint = VolumeConstraint(problem.che)
 problem.add_equation(problem.volume_constraint)
-problem.volume_constraint.fixed_volume = np.trapz(
+problem.volume_constraint.fixed_volume = trapezoid(
     problem.che.u, problem.che.x[0])
 problem.continuation_parameter = (problem.volume_constraint, 'fixed_volume')
 
@@ -41,7 +41,7 @@ if not os.path.exists("initial_state.npz"):
         # perform dealiasing
         problem.dealias()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             print("diverged")
@@ -35,7 +35,7 @@ while dudtnorm > 1e-5:
     # perform timestep
     problem.time_step()
     # calculate the new norm
-    dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+    dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
 
 # start parameter continuation
 problem.settings.always_locate_bifurcations = True
@@ -11,6 +11,14 @@ from bice import Problem, time_steppers
 from bice.pde.finite_differences import FiniteDifferencesEquation, PeriodicBC
 from bice.continuation import ConstraintEquation
 from bice import profile
+from bice.core.jit import equation_kernel
+
+
+# fused local part of the SHE, res += (r - kc^4)*u + v*u^2 - g*u^3 = u*(a + u*(v - g*u)),
+# evaluated in a single pass, compiled with numba if available
+@equation_kernel
+def add_local_terms(res, u, a, v, g):
+    res += u * (a + u * (v - g * u))
 
 
 class SwiftHohenbergEquation(FiniteDifferencesEquation):
@@ -18,10 +26,13 @@ class SwiftHohenbergEquation(FiniteDifferencesEquation):
     Finite difference implementation of the 1-dimensional Swift-Hohenberg Equation
     equation, a nonlinear PDE
     \partial t h &= (r - (kc^2 + \Delta)^2)h + v * h^2 - g * h^3
+    With use_fft=True, the linear part is applied with a single pair of FFTs instead of the
+    sparse matrix, an alternative for wide stencils (high approximation orders).
     """
 
-    def __init__(self, N, L):
+    def __init__(self, N, L, use_fft=False):
         super().__init__()
+        self.use_fft = use_fft
         # parameters
         self.r = -0.013
         self.kc = 0.5
@@ -37,10 +48,17 @@ class SwiftHohenbergEquation(FiniteDifferencesEquation):
         self.build_FD_matrices(approx_order=2)
         laplace = self.laplace()
         self.linear_op = -2 * self.kc**2 * laplace - laplace.dot(laplace)
+        # Fourier multipliers of the (circulant) linear part, None if use_fft is off
+        self.linear_op_hat = self.circulant_multipliers(self.linear_op)
 
     # definition of the SHE (right-hand side)
     def rhs(self, u):
-        return self.linear_op.dot(u) + (self.r - self.kc**4) * u + self.v * u**2 - self.g * u**3
+        if self.linear_op_hat is not None:
+            res = np.fft.irfft(self.linear_op_hat * np.fft.rfft(u), n=u.size)
+        else:
+            res = self.linear_op.dot(u)
+        add_local_terms(res, u, self.r - self.kc**4, self.v, self.g)
+        return res
 
     # definition of the Jacobian
     @profile
@@ -50,10 +68,10 @@ class SwiftHohenbergEquation(FiniteDifferencesEquation):
 
 class SwiftHohenbergProblem(Problem):
 
-    def __init__(self, N, L):
+    def __init__(self, N, L, use_fft=False):
         super().__init__()
         # Add the Swift-Hohenberg equation to the problem
-        self.she = SwiftHohenbergEquation(N, L)
+        self.she = SwiftHohenbergEquation(N, L, use_fft)
         self.add_equation(self.she)
         # initialize time stepper
         self.time_stepper = time_steppers.BDF(self)
@@ -2,12 +2,20 @@
 import shutil
 import os
 import numpy as np
+import scipy.fft
 from scipy.sparse import diags
 import matplotlib.pyplot as plt
 from bice import Problem, time_steppers
 from bice.pde import FiniteDifferencesEquation, PseudospectralEquation
 from bice.continuation import TranslationConstraint
 from bice import profile, Profiler
+from bice.core.jit import equation_kernel
+
+
+# fused nonlinear part of the SHE, res += v*u^2 - g*u^3, compiled with numba if available
+@equation_kernel
+def add_nonlinearity(res, u, v, g):
+    res += u * u * (v - g * u)
 
 
 class SwiftHohenbergEquation(PseudospectralEquation):
@@ -15,10 +23,14 @@ class SwiftHohenbergEquation(PseudospectralEquation):
     Pseudospectral implementation of the 1-dimensional Swift-Hohenberg Equation
     equation, a nonlinear PDE
     \partial t h &= (r - (kc^2 + \Delta)^2)h + v * h^2 - g * h^3
+    With dtype=np.float32, the unknowns, the k-vectors and thus the whole FFT pipeline
+    are in single precision, which suffices for moderate error tolerances.
     """
 
-    def __init__(self, N, L):
+    def __init__(self, N, L, dtype=np.float64):
         super().__init__(shape=N)
+        # the floating point precision of the unknowns and the Fourier space
+        self.dtype = np.dtype(dtype)
         # parameters
         self.r = -0.013
         self.kc = 0.5
@@ -26,44 +38,90 @@ class SwiftHohenbergEquation(PseudospectralEquation):
         self.g = 1
         # space and fourier space
         self.x = [np.linspace(-L/2, L/2, N)]
-        self.build_kvectors(real_fft=True)
+        self.build_kvectors(real_fft=True, dtype=self.dtype)
+        # cache for the linear part in Fourier space and the parameters it was computed for
+        self._linop = None
+        self._linop_params = None
+        # cache for the r-independent part (kc^2 - k^2)^2 and the kc it was computed for
+        self._k_biharm = None
+        self._k_biharm_kc = None
+        # cache for the last rhs and the unknowns and parameters it was evaluated for,
+        # e.g., the norm of du/dt in the time loop is reused by the next time step
+        self._last_rhs = None
+        self._last_rhs_u = None
+        self._last_rhs_params = None
         # initial condition
-        self.u = np.cos(
-            2 * np.pi * self.x[0] / 10) * np.exp(-0.005 * self.x[0]**2)
+        self.u = (np.cos(2 * np.pi * self.x[0] / 10) *
+                  np.exp(-0.005 * self.x[0]**2)).astype(self.dtype)
+
+    # the linear part (r - (kc^2 - k^2)^2) in Fourier space, recomputed only if r or kc changed,
+    # during the continuation in r only the subtraction needs to be repeated
+    @property
+    def linop(self):
+        if self._linop_params != (self.r, self.kc):
+            if self._k_biharm_kc != self.kc:
+                self._k_biharm = (self.kc**2 - self.k[0]**2)**2
+                self._k_biharm_kc = self.kc
+            self._linop = self.r - self._k_biharm
+            self._linop_params = (self.r, self.kc)
+        return self._linop
 
     # definition of the SHE (right-hand side)
     @profile
     def rhs(self, u):
-        u_k = np.fft.rfft(u)
-        return np.fft.irfft((self.r - (self.kc**2 - self.k[0]**2)**2) * u_k) + self.v * u**2 - self.g * u**3
+        params = (self.r, self.kc, self.v, self.g)
+        if self._last_rhs_params == params and np.array_equal(self._last_rhs_u, u):
+            return self._last_rhs
+        # scipy.fft caches the FFT plans (twiddle factors) between calls, the spectrum
+        # is multiplied in place and may be overwritten by the inverse transform
+        u_k = scipy.fft.rfft(u)
+        u_k *= self.linop
+        res = scipy.fft.irfft(u_k, n=u.size, overwrite_x=True)
+        add_nonlinearity(res, u, self.v, self.g)
+        # the cached result is shared with the callers, so it must not be modified
+        res.flags.writeable = False
+        self._last_rhs, self._last_rhs_u, self._last_rhs_params = res, u.copy(), params
+        return res
 
     # definition of spatial derivative for translation constraint
     def du_dx(self, u, direction=0):
-        du_dx = 1j*self.k[direction]*np.fft.rfft(u)
-        return np.fft.irfft(du_dx)
+        du_dx = scipy.fft.rfft(u)
+        du_dx *= 1j*self.k[direction]
+        return scipy.fft.irfft(du_dx, n=u.size, overwrite_x=True)
 
 
 class SwiftHohenbergProblem(Problem):
 
-    def __init__(self, N, L):
+    def __init__(self, N, L, dtype=np.float64):
         super().__init__()
         # Add the Swift-Hohenberg equation to the problem
-        self.she = SwiftHohenbergEquation(N, L)
+        self.she = SwiftHohenbergEquation(N, L, dtype)
         self.add_equation(self.she)
         # initialize time stepper
         self.time_stepper = time_steppers.RungeKuttaFehlberg45(dt=1e-3)
         self.time_stepper.error_tolerance = 1e-7
+        # single precision cannot resolve residuals much below the default tolerances
+        if self.she.dtype == np.float32:
+            self.time_stepper.error_tolerance = 1e-4
+            self.newton_solver.convergence_tolerance = 1e-5
+            self.continuation_stepper.convergence_tolerance = 1e-5
         # assign the continuation parameter
         self.continuation_parameter = (self.she, "r")
+        # cache for the slice of the modes removed by dealias and the (N, fraction) it is for
+        self._dealias_slice = None
+        self._dealias_key = None
 
     # set higher modes to null, for numerical stability
     @profile
     def dealias(self, fraction=1./2.):
-        u_k = np.fft.rfft(self.she.u)
-        N = len(u_k)
-        k = int(N*fraction)
-        u_k[k+1:-k] = 0
-        self.she.u = np.fft.irfft(u_k)
+        N = self.she.u.size
+        if self._dealias_key != (N, fraction):
+            k = int((N//2 + 1)*fraction)
+            self._dealias_slice = slice(k+1, -k)
+            self._dealias_key = (N, fraction)
+        u_k = scipy.fft.rfft(self.she.u)
+        u_k[self._dealias_slice] = 0
+        self.she.u = scipy.fft.irfft(u_k, n=N, overwrite_x=True)
 
 
 # create output folder
@@ -97,7 +155,7 @@ if not os.path.exists("initial_state.npz"):
         # perform timestep
         problem.time_step()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             break
@@ -4,6 +4,7 @@ from scipy.sparse import diags
 from bice import Problem, time_steppers
 from bice.pde import FiniteDifferencesEquation
 from bice.pde.finite_differences import NeumannBC, DirichletBC, RobinBC, NoBoundaryConditions
+from bice.continuation.constraints import trapezoid
 from bice import profile
 
 
@@ -115,4 +116,4 @@ class CoatingProblem(Problem):
         # self.time_stepper = time_steppers.BDF(self)
 
     def norm(self):
-        return np.trapz(self.tfe.u, self.tfe.x[0])
+        return trapezoid(self.tfe.u, self.tfe.x[0])
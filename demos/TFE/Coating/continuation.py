@@ -42,7 +42,7 @@ if not os.path.exists("initial_state.npz"):
         # perform timestep
         problem.time_step()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             print("Aborted.")
@@ -10,6 +10,77 @@ from bice import Problem, time_steppers
 from bice.pde.finite_differences import FiniteDifferencesEquation, NeumannBC, DirichletBC, NoBoundaryConditions
 from bice.core.profiling import Profiler
 from bice.continuation import NaturalContinuation
+from bice.continuation.constraints import trapz_weights
+from bice.core.jit import HAS_NUMBA, equation_kernel, prange
+
+
+# row i of the affine FD operator Q*u + g*G, given in a banded form (offsets, coeffs, G),
+# with the coefficients coeffs[i, k] = Q[i, i+offsets[k]] of the diagonals of Q, applied to
+# both fields u and v in a single sweep over the band of the row.
+# It is inlined into the kernel, since the returned tuple is expensive for a function call.
+@equation_kernel(inline="always")
+def band_row(op, u, v, i, g_u=1., g_v=1.):
+    offsets, coeffs, G = op
+    s_u = g_u * G[i]
+    s_v = g_v * G[i]
+    for k in range(offsets.size):
+        j = i + offsets[k]
+        if 0 <= j < u.size:
+            s_u += coeffs[i, k] * u[j]
+            s_v += coeffs[i, k] * v[j]
+    return s_u, s_v
+
+
+# fused rhs of the adaptive substrate equation, compiled with numba: the pointwise terms and
+# the sparse products of the FD operators (see band_row) are evaluated in three passes over the
+# grid, writing only into the scratch buffers (dFdh, dFdz, fluxes) and the result.
+# The points of each pass are independent, so the passes may be split across threads.
+def _adaptive_substrate_rhs(h, z, laplace_h, nabla0, nabla_F, nabla_h, theta, h_p,
+                                  sigma, gamma_bl, Nlk, T, chi, D, M, U,
+                                  dFdh, dFdz, flux_h, flux_z, out):
+    N = h.size
+    H_dry = sigma * Nlk
+    djp_pf = 5/3 * (theta * h_p)**2
+    h_p3 = h_p**3
+    # free energy variations
+    for i in prange(N):
+        # laplace_h(h+z) and laplace_h(z)
+        offsets, coeffs, G = laplace_h
+        laplace_hz = G[i]
+        laplace_z = G[i]
+        for k in range(offsets.size):
+            j = i + offsets[k]
+            if 0 <= j < N:
+                laplace_hz += coeffs[i, k] * (h[j] + z[j])
+                laplace_z += coeffs[i, k] * z[j]
+        # powers of h and 1/(H_dry+z) by multiplication, with a single division each
+        inv_Hz = 1 / (H_dry + z[i])
+        c = H_dry * inv_Hz
+        inv_h3 = 1 / (h[i] * h[i] * h[i])
+        djp = djp_pf * (h_p3 * inv_h3 - 1) * inv_h3
+        # 1 - c = z/(H_dry+z) without cancellation for c close to 1
+        dfbrush = T * (sigma**2 / c + c + np.log(z[i] * inv_Hz)) + T * chi * c * inv_Hz
+        dFdh[i] = -laplace_hz - djp
+        dFdz[i] = -laplace_hz - gamma_bl * laplace_z + dfbrush
+    # fluxes
+    for i in prange(N):
+        grad_h, grad_z = band_row(nabla0, dFdh, dFdz, i)
+        flux_h[i] = h[i] * h[i] * h[i] * grad_h
+        flux_z[i] = D * z[i] * grad_z
+    # flux into the liquid film to conserve liquid volume
+    q = -(h[-1] - h[0] + z[-1] - z[0]) * U
+    # dynamic equations, including the absorption and advection terms
+    for i in prange(N):
+        M_absorb = M * (dFdh[i] - dFdz[i])
+        div_h, div_z = band_row(nabla_F, flux_h, flux_z, i, q, 0.)
+        adv_h, adv_z = band_row(nabla_h, h, z, i)
+        out[0, i] = div_h - M_absorb - U * adv_h
+        out[1, i] = div_z + M_absorb - U * adv_z
+
+
+adaptive_substrate_rhs_kernel = equation_kernel(_adaptive_substrate_rhs)
+# multithreaded version, the threads are forked and joined in each of the three passes
+adaptive_substrate_rhs_kernel_parallel = equation_kernel(_adaptive_substrate_rhs, parallel=True)
 
 
 class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
@@ -37,6 +108,14 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
         h = np.maximum(hmax - s**2 / (4 * hmax) * self.theta**2, self.h_p)
         z = 0*s + 0.1
         self.u = np.array([h, z])
+        # the operator arguments of the compiled rhs kernel, the operators they belong to
+        # and the scratch buffers of the kernel
+        self._kernel_args = None
+        self._kernel_ops = None
+        self._kernel_buffers = None
+        #: use the multithreaded rhs kernel? This only pays off for large grids, for small
+        #: grids (such as N=256) the overhead of the threads exceeds the work per pass
+        self.parallel = False
         # build finite difference matrices
         self.build_FD_matrices(approx_order=2)
 
@@ -61,6 +140,8 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
     def rhs(self, u):
         # expand unknowns
         h, z = u
+        if HAS_NUMBA:
+            return self.compiled_rhs(h, z)
         # dry brush height
         H_dry = self.sigma * self.Nlk
         # polymer volume fraction (polymer concentration)
@@ -74,8 +155,8 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
         # mobilities
         Qhh = h3
         Qzz = self.D * z
-        # brush energy derivative
-        dfbrush = self.T * (self.sigma**2 / c + c + np.log(1 - c))
+        # brush energy derivative, with 1 - c = z/(H_dry+z) to avoid cancellation
+        dfbrush = self.T * (self.sigma**2 / c + c + np.log(z / (H_dry + z)))
         # include miscibility effects
         dfbrush += self.T * self.chi * c / (z + H_dry)
         # free energy variations
@@ -86,14 +167,45 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
         M_absorb = self.M * (dFdh - dFdz)
         # flux into the liquid film to conserve liquid volume
         q = -(h[-1] - h[0] + z[-1] - z[0]) * self.U
-        # dynamic equations
-        dhdt = self.nabla_F(Qhh * self.nabla0(dFdh), q) - M_absorb
-        dzdt = self.nabla_F(Qzz * self.nabla0(dFdz), 0) + M_absorb
+        # dynamic equations, written directly into the rows of the result
+        res = np.empty((2, h.size))
+        dhdt = self.nabla_F(Qhh * self.nabla0(dFdh), q, out=res[0])
+        dzdt = self.nabla_F(Qzz * self.nabla0(dFdz), 0, out=res[1])
+        dhdt -= M_absorb
+        dzdt += M_absorb
         # advection term
         dhdt -= self.U * self.nabla_h(h)
         dzdt -= self.U * self.nabla_h(z)
-        # combine and return
-        return np.array([dhdt, dzdt])
+        return res
+
+    # the rhs using the compiled kernel
+    def compiled_rhs(self, h, z):
+        N = h.size
+        ops = (self.laplace_h, self.nabla0, self.nabla_F, self.nabla_h)
+        # the operators are rebuilt with mesh adaption, so their arrays are unpacked only
+        # if the operators changed
+        if self._kernel_ops != ops:
+            args = []
+            for op in ops:
+                Q = op.Q.todia()
+                offsets = np.sort(Q.offsets).astype(np.int64)
+                # align the diagonals with the rows: coeffs[i, k] = Q[i, i+offsets[k]]
+                coeffs = np.zeros((N, offsets.size))
+                for k, offset in enumerate(offsets):
+                    d = Q.diagonal(offset)
+                    coeffs[max(0, -offset):max(0, -offset)+d.size, k] = d
+                args.append((offsets, coeffs, np.broadcast_to(op.G, N).astype(np.float64)))
+            self._kernel_args = tuple(args)
+            self._kernel_ops = ops
+            self._kernel_buffers = tuple(np.empty(N) for _ in range(4))
+        # the parameters are passed as floats, so that the kernel is compiled only once
+        params = (self.theta, self.h_p, self.sigma, self.gamma_bl, self.Nlk, self.T,
+                  self.chi, self.D, self.M, self.U)
+        out = np.empty((2, N))
+        kernel = adaptive_substrate_rhs_kernel_parallel if self.parallel else \
+            adaptive_substrate_rhs_kernel
+        kernel(h, z, *self._kernel_args, *map(float, params), *self._kernel_buffers, out)
+        return out
 
     def jacobian2(self, u):
         # expand unknowns
@@ -111,8 +223,8 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
         # mobilities
         Qhh = h**3
         Qzz = self.D * z
-        # brush energy derivative
-        dfbrush = self.T * (self.sigma**2 / c + c + np.log(1 - c))
+        # brush energy derivative, with 1 - c = z/(H_dry+z) to avoid cancellation
+        dfbrush = self.T * (self.sigma**2 / c + c + np.log(z / (H_dry + z)))
         # include miscibility effects
         dfbrush += self.T * self.chi * c / (z + H_dry)
         # free energy variations
@@ -173,7 +285,7 @@ class AdaptiveSubstrateEquation(FiniteDifferencesEquation):
 
     def liquid_volume(self):
         h, z = self.u
-        return np.trapz(h+z, self.x[0])
+        return np.dot(trapz_weights(self.x[0]), h+z)
 
     def plot(self, ax):
         ax.set_ylim((0, 1.5))
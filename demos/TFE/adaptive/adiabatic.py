@@ -35,8 +35,8 @@ if not os.path.exists("initial_state.npz"):
             problem.plot(ax)
             fig.savefig(f"out/img/{plotID:05d}.svg")
             plotID += 1
-        print(
-            f"step #:{n:6d},  time:{problem.time:9.2e},  dt:{problem.time_stepper.dt:9.2e},  norm:{problem.norm():9.2e}")
+            print(
+                f"step #:{n:6d},  time:{problem.time:9.2e},  dt:{problem.time_stepper.dt:9.2e},  norm:{problem.norm():9.2e}")
         n += 1
         # perform timestep
         problem.time_step()
@@ -34,9 +34,9 @@ if not os.path.exists("initial_state.npz"):
             problem.plot(ax)
             fig.savefig(f"out/img/{plotID:05d}.svg")
             plotID += 1
-        print(f"step #: {n}")
-        print(f"time:   {problem.time}")
-        print(f"dt:     {problem.time_stepper.dt}")
+            print(f"step #: {n}")
+            print(f"time:   {problem.time}")
+            print(f"dt:     {problem.time_stepper.dt}")
         n += 1
         # perform timestep
         problem.time_step()
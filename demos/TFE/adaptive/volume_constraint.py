@@ -1,6 +1,7 @@
 import numpy as np
 import scipy.sparse as sp
 from bice.continuation import ConstraintEquation
+from bice.continuation.constraints import trapz_weights
 from bice import profile
 
 
@@ -38,10 +39,8 @@ class VolumeConstraint(ConstraintEquation):
         # employ the constraint equation
         # calculate the difference in volumes between current
         # and previous unknowns of the reference equation
-        x = self.ref_eq.x[0]
-        res[self_idx] = np.array([
-            np.trapz(u[eq_idx1] - self.group.u[eq_idx1], x),
-        ])
+        w = trapz_weights(self.ref_eq.x[0])
+        res[self_idx] = np.dot(w, u[eq_idx1] - self.group.u[eq_idx1])
         # res[self_idx] = np.array([
         #     np.trapz(u[eq_idx1] + u[eq_idx2] -
         #              self.group.u[eq_idx1] - self.group.u[eq_idx2], x),
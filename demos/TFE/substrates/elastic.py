@@ -6,6 +6,7 @@ import scipy.sparse as sp
 import matplotlib.pyplot as plt
 from bice import Problem
 from bice.pde.finite_differences import FiniteDifferencesEquation, NeumannBC
+from bice.continuation.constraints import trapezoid
 # from bice.continuation import TranslationConstraint, VolumeConstraint
 from bice import Profiler
 from two_field_volume_constraint import VolumeConstraint
@@ -84,7 +85,7 @@ class ThinFilm(Problem):
         h, xi = self.tfe.u
         x = self.tfe.x[0]
         L = np.max(x) - np.min(x)
-        return np.trapz(h**2, x) / L
+        return trapezoid(h**2, x) / L
 
 
 # create output folder
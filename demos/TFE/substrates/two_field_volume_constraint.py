@@ -1,6 +1,7 @@
 import numpy as np
 import scipy.sparse as sp
 from bice.continuation import ConstraintEquation
+from bice.continuation.constraints import trapezoid, trapz_weights
 from bice import profile
 
 
@@ -40,8 +41,8 @@ class VolumeConstraint(ConstraintEquation):
         # and previous unknowns of the reference equation
         x = self.ref_eq.x[0]
         res[self_idx] = np.array([
-            np.trapz(u[eq_idx1] - self.group.u[eq_idx1], x),
-            np.trapz(u[eq_idx2] - self.group.u[eq_idx2], x)
+            trapezoid(u[eq_idx1] - self.group.u[eq_idx1], x),
+            trapezoid(u[eq_idx2] - self.group.u[eq_idx2], x)
         ])
         # Add the constraint to the reference equation: unknown influx is the Langrange multiplier
         res[eq_idx1] = u[self_idx][0]
@@ -73,7 +74,7 @@ class VolumeConstraint(ConstraintEquation):
         if self.fixed_volume is None:
             dcnstr_du = np.ones((1, N)) / float(N)
         else:
-            dcnstr_du = np.trapz(np.eye(N), eq.x[0]).reshape((1, N))
+            dcnstr_du = trapz_weights(eq.x[0]).reshape((1, N))
         # contribution of d(constraint) / dinflux
         dcnstr_dv = sp.csr_matrix((1, 1))
         # stack everything together and return
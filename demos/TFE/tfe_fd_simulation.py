@@ -3,13 +3,43 @@ import shutil
 import os
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.animation import FFMpegWriter, writers
 import scipy.sparse as sp
 from bice import Problem, time_steppers
 from bice.pde import FiniteDifferencesEquation
 from bice.pde.finite_differences import RobinBC, PeriodicBC, NeumannBC, DirichletBC, NoBoundaryConditions
 from bice.continuation import VolumeConstraint, TranslationConstraint
+from bice.continuation.constraints import trapz_weights
 from bice import profile, Profiler
 from bice.core.solvers import NewtonSolver, MyNewtonSolver, NewtonKrylovSolver
+from bice.core.jit import HAS_NUMBA, equation_kernel
+
+
+# fused rhs of the thin-film equation, compiled with numba: the FD operators are passed as
+# CSR arrays (indptr, indices, data) and their constant parts G, so that the products and
+# the pointwise arithmetic are done in a single pass without temporary arrays
+@equation_kernel
+def thin_film_rhs_kernel(h, dFdh, n_ptr, n_idx, n_val, n_G, l_ptr, l_idx, l_val, l_G,
+                         flux, out):
+    N = h.size
+    # flux = h^3 * nabla(dFdh)
+    for i in range(N):
+        s = n_G[i]
+        for j in range(n_ptr[i], n_ptr[i+1]):
+            s += n_val[j] * dFdh[n_idx[j]]
+        flux[i] = h[i]**3 * s
+    for i in range(N):
+        # eq1 = nabla(flux)
+        s = n_G[i]
+        for j in range(n_ptr[i], n_ptr[i+1]):
+            s += n_val[j] * flux[n_idx[j]]
+        out[0, i] = s
+        # eq2 = -laplace(h) - djp - dFdh
+        s = l_G[i]
+        for j in range(l_ptr[i], l_ptr[i+1]):
+            s += l_val[j] * h[l_idx[j]]
+        h3 = h[i]**3
+        out[1, i] = -s - (1./h3**2 - 1./h3) - dFdh[i]
 
 
 class ThinFilmEquation(FiniteDifferencesEquation):
@@ -41,15 +71,48 @@ class ThinFilmEquation(FiniteDifferencesEquation):
         # self.bc = NeumannBC()
         # build finite differences matrices
         self.build_FD_matrices()
+        # the arguments of the compiled rhs kernel, the operators they belong to
+        # and a scratch buffer for the flux
+        self._kernel_args = None
+        self._kernel_ops = None
+        self._flux = None
 
     # definition of the equation
     def rhs(self, u):
         h, dFdh = u
+        if HAS_NUMBA:
+            return self.compiled_rhs(h, dFdh)
+        # without numba, write the sparse products into preallocated rows of the result
+        # and combine the terms in place, to avoid the temporaries of each operation
         h3 = h**3
         djp = 1./h3**2 - 1./h3
-        eq1 = self.nabla(h3 * self.nabla(dFdh))
-        eq2 = -self.laplace(h) - djp - dFdh
-        return np.array([eq1, eq2])
+        res = np.empty((2, h.size))
+        flux = self.nabla(dFdh, out=res[1])
+        flux *= h3
+        self.nabla(flux, out=res[0])
+        self.laplace(h, out=res[1])
+        res[1] += djp
+        res[1] += dFdh
+        res[1] *= -1
+        return res
+
+    # the rhs using the compiled kernel
+    def compiled_rhs(self, h, dFdh):
+        N = h.size
+        # the operators are rebuilt with mesh adaption, so their arrays are unpacked only
+        # if the operators changed
+        if self._kernel_ops != (self.nabla, self.laplace):
+            args = []
+            for op in (self.nabla, self.laplace):
+                Q = op.Q.tocsr()
+                args += [Q.indptr, Q.indices, Q.data,
+                         np.broadcast_to(op.G, N).astype(np.float64)]
+            self._kernel_args = tuple(args)
+            self._kernel_ops = (self.nabla, self.laplace)
+            self._flux = np.empty(N)
+        out = np.empty((2, N))
+        thin_film_rhs_kernel(h, dFdh, *self._kernel_args, self._flux, out)
+        return out
 
     def jacobian(self, u):
         h, dFdh = u
@@ -61,7 +124,8 @@ class ThinFilmEquation(FiniteDifferencesEquation):
         return sp.bmat([[eq1dh, eq1dF], [eq2dh, eq2dF]])
 
     def du_dx(self, u, direction=0):
-        return self.nabla[direction](u)
+        # 1d: nabla is a single operator, applied to each of the variables (h, dFdh)
+        return np.array([self.nabla(v) for v in u])
 
     def plot(self, ax):
         ax.set_xlabel("x")
@@ -72,11 +136,12 @@ class ThinFilmEquation(FiniteDifferencesEquation):
         ax.legend()
 
     def mass_matrix(self):
+        # only h has a time derivative: diagonal with ones for h and zeros for dFdh
+        # NOTE: the group of equations caches the assembled matrix until the mesh is adapted
         nvar, ngrid = self.shape
-        dynamics = np.eye(nvar)
-        dynamics[1, 1] = 0
-        I = sp.eye(ngrid)
-        return sp.kron(dynamics, I)
+        dynamics = np.zeros((nvar, ngrid))
+        dynamics[0] = 1
+        return sp.diags(dynamics.ravel(), format="csr")
 
 
 class ThinFilm(Problem):
@@ -92,6 +157,8 @@ class ThinFilm(Problem):
         self.translation_constraint = TranslationConstraint(self.tfe)
         # initialize time stepper
         self.time_stepper = time_steppers.BDF2(dt=1e-1)
+        # reuse the factorized Jacobian for several time steps
+        self.time_stepper.max_jacobian_age = 5
         # self.time_stepper = time_steppers.ImplicitEuler(dt=1e-2)
         # self.time_stepper = time_steppers.BDF(self)
         # assign the continuation parameter
@@ -105,7 +172,8 @@ class ThinFilm(Problem):
         self.newton_solver.verbosity = 0
 
     def norm(self):
-        return np.trapz(self.tfe.u, self.tfe.x[0])
+        # volume of the film height h = u[0]
+        return np.dot(trapz_weights(self.tfe.x[0]), self.tfe.u[0])
 
 
 # create output folder
@@ -126,11 +194,19 @@ n = 0
 plotevery = 10
 dudtnorm = 1
 if not os.path.exists("initial_state2.dat"):
+    # if ffmpeg is available, stream the frames into a single video through an open pipe,
+    # otherwise save every frame as a separate image
+    video = FFMpegWriter(fps=10) if writers.is_available("ffmpeg") else None
+    if video is not None:
+        video.setup(fig, "out/time_stepping.mp4", dpi=72)
     while dudtnorm > 1e-8:
         # plot
         if n % plotevery == 0:
             problem.plot(ax)
-            fig.savefig(f"out/img/{plotID:05d}.png")
+            if video is None:
+                fig.savefig(f"out/img/{plotID:05d}.png")
+            else:
+                video.grab_frame()
             plotID += 1
             print(f"step #: {n}")
             print(f"time:   {problem.time}")
@@ -142,12 +218,14 @@ if not os.path.exists("initial_state2.dat"):
         # adapt the mesh
         if n % 10 == 0:
             problem.adapt()
-        # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        # calculate the new norm, reuse the rhs of the time-stepper if available
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             print("Aborted.")
             break
+    if video is not None:
+        video.finish()
     Profiler.print_summary()
     # save the state, so we can reload it later
     problem.save("initial_state.npz")
@@ -163,8 +241,8 @@ problem.continuation_stepper.ds = 1e-2
 problem.continuation_stepper.ndesired_newton_steps = 3
 
 # Impose the constraints
-problem.volume_constraint.fixed_volume = np.trapz(
-    problem.tfe.u, problem.tfe.x[0])
+problem.volume_constraint.fixed_volume = np.dot(
+    trapz_weights(problem.tfe.x[0]), problem.tfe.u[0])
 problem.add_equation(problem.volume_constraint)
 problem.add_equation(problem.translation_constraint)
 
@@ -6,6 +6,7 @@ import matplotlib.pyplot as plt
 from bice import Problem, time_steppers
 from bice.pde import PseudospectralEquation
 from bice.continuation import VolumeConstraint, TranslationConstraint
+from bice.continuation.constraints import trapz_weights
 
 
 class ThinFilmEquation(PseudospectralEquation):
@@ -24,6 +25,13 @@ class ThinFilmEquation(PseudospectralEquation):
         self.x = [np.linspace(-L/2, L/2, N, endpoint=False)]
         x = self.x[0]
         self.build_kvectors(real_fft=True)
+        # cache for the dealiasing filter and the (k, ratio) it was computed for
+        self._dealias_filter = None
+        self._dealias_filter_key = None
+        # cache for the last rhs and the unknowns it was evaluated for, e.g., the norm
+        # of du/dt in the time loop is reused by the next time step
+        self._last_rhs = None
+        self._last_rhs_u = None
         # initial condition
         # self.u = np.ones(N) * 3
         self.u = 2 * np.cos(x*2*np.pi/L) + 1
@@ -31,6 +39,8 @@ class ThinFilmEquation(PseudospectralEquation):
 
     # definition of the equation, using pseudospectral method
     def rhs(self, h):
+        if np.array_equal(self._last_rhs_u, h):
+            return self._last_rhs
         h_k = np.fft.rfft(h)
         k = self.k[0]
         djp_k = self.dealias(np.fft.rfft(self.djp(h)))
@@ -38,7 +48,11 @@ class ThinFilmEquation(PseudospectralEquation):
             self.dealias(np.fft.rfft(h**3)) * 1j * k))
         term1 = np.fft.irfft(self.dealias(1j * k * (-k**2 * h_k + djp_k)))
         term2 = np.fft.irfft(self.dealias(k**2 * (k**2 * h_k - djp_k)))
-        return -dhhh_dx * term1 - h**3 * term2
+        res = -dhhh_dx * term1 - h**3 * term2
+        # the cached result is shared with the callers, so it must not be modified
+        res.flags.writeable = False
+        self._last_rhs, self._last_rhs_u = res, h.copy()
+        return res
 
     # disjoining pressure
     def djp(self, h):
@@ -50,15 +64,23 @@ class ThinFilmEquation(PseudospectralEquation):
             u_k = np.fft.rfft(u)
         else:
             u_k = u
-        k = self.k[0]
-        k_F = (1-ratio) * k[-1]
-        u_k *= np.exp(-36*(4. * k / 5. / k_F)**36)
+        u_k *= self.dealias_filter(ratio)
         if real_space:
             return np.fft.irfft(u_k)
         return u_k
 
+    # the exponential filter of the higher modes, recomputed only if k or the ratio changed
+    def dealias_filter(self, ratio=1./2.):
+        k = self.k[0]
+        if self._dealias_filter_key is None or self._dealias_filter_key[0] is not k \
+                or self._dealias_filter_key[1] != ratio:
+            k_F = (1-ratio) * k[-1]
+            self._dealias_filter = np.exp(-36*(4. * k / 5. / k_F)**36)
+            self._dealias_filter_key = (k, ratio)
+        return self._dealias_filter
+
     def du_dx(self, u, direction=0):
-        du_dx = 1j*self.k*np.fft.rfft(u)
+        du_dx = 1j*self.k[direction]*np.fft.rfft(u)
         return np.fft.irfft(du_dx)
 
 
@@ -88,7 +110,7 @@ class ThinFilm(Problem):
         self.tfe.u = self.tfe.dealias(self.tfe.u, True)
 
     def norm(self):
-        return np.trapz(self.tfe.u, self.tfe.x[0])
+        return np.dot(trapz_weights(self.tfe.x[0]), self.tfe.u)
 
 
 # create output folder
@@ -104,7 +126,7 @@ plotID = 0
 
 # time-stepping
 n = 0
-plotevery = 1
+plotevery = 10
 dudtnorm = 1
 if not os.path.exists("initial_state.npz"):
     while dudtnorm > 1e-8:
@@ -123,7 +145,7 @@ if not os.path.exists("initial_state.npz"):
         # perform dealiasing
         problem.dealias()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             print("Aborted.")
@@ -139,8 +161,8 @@ problem.continuation_stepper.ds = 1e-2
 problem.continuation_stepper.ndesired_newton_steps = 3
 
 # Impose the constraints
-problem.volume_constraint.fixed_volume = np.trapz(
-    problem.tfe.u, problem.tfe.x[0])
+problem.volume_constraint.fixed_volume = np.dot(
+    trapz_weights(problem.tfe.x[0]), problem.tfe.u)
 problem.add_equation(problem.volume_constraint)
 problem.add_equation(problem.translation_constraint)
 
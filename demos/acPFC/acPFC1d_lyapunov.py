@@ -46,7 +46,7 @@ if not os.path.exists("initial_state.npz"):
         # perform timestep
         problem.time_step()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # catch divergent solutions
         if np.max(problem.u) > 1e12:
             print("diverged")
@@ -63,7 +63,9 @@ problem.time_stepper = time_steppers.BDF2(dt=0.1)
 lyapunov = LyapunovExponentCalculator(
     problem, nexponents=1, epsilon=1e-6, nintegration_steps=1)
 
-last10 = []
+# ring buffer of the last 10 Lyapunov exponents, the latest at index (nlast10 - 1) % 10
+last10 = np.empty((10, lyapunov.nexponents))
+nlast10 = 0
 largest = []
 L2norms = [problem.norm()]
 times = [problem.time]
@@ -77,11 +79,12 @@ while True:
     # perform Lyapunov exponent calculation step
     lyapunov.step()
     # store last10 and largest Lyapunov exponents
-    last10 = [lyapunov.exponents] + last10[:9]
-    largest += [np.max(lyapunov.exponents)]
+    last10[nlast10 % 10] = lyapunov.exponents
+    nlast10 += 1
+    largest.append(np.max(lyapunov.exponents))
 
-    L2norms += [problem.norm()]
-    times += [problem.time]
+    L2norms.append(problem.norm())
+    times.append(problem.time)
 
     ax_largest.clear()
     ax_sol.clear()
@@ -138,7 +138,7 @@ if __name__ == "__main__":
         # perform timestep
         problem.time_step()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # add new norm and time and u
         L2norms += [problem.norm()]
         times += [problem.time]
@@ -170,7 +170,7 @@ if __name__ == "__main__":
         # perform timestep
         problem.time_step()
         # calculate the new norm
-        dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+        dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
         # add new norm and time and u
         L2norms += [problem.norm()]
         times += [problem.time]
@@ -55,7 +55,7 @@ for idx in [0, 1]:
             n += 1
             # perform timestep
             problem.time_step()
-            dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+            dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
             if np.max(problem.u) > 1e12:
                 print("diverged")
                 break
@@ -88,7 +88,7 @@ for v0 in np.arange(0., 0.7, 0.05):
             i += 1
             # perform timestep
             problem.time_step()
-            dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+            dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
             if np.max(problem.u) > 1e12:
                 print("diverged")
                 break
@@ -58,7 +58,7 @@ for idx in [0, 1]:
             n += 1
             # perform timestep
             problem.time_step()
-            dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+            dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
             if np.max(problem.u) > 1e12:
                 print("diverged")
                 break
@@ -91,7 +91,7 @@ for v0 in [0.]:#np.arange(0., 0.7, 0.05):
             i += 1
             # perform timestep
             problem.time_step()
-            dudtnorm = np.linalg.norm(problem.rhs(problem.u))
+            dudtnorm = np.linalg.norm(problem.time_stepper.current_rhs(problem))
             if np.max(problem.u) > 1e12:
                 print("diverged")
                 break
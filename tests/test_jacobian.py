@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+import numpy as np
+import scipy.sparse as sp
+from bice.core.equation import Equation
+from bice.core.jit import JITEquation
+from bice.core.solvers import NewtonSolver
+import unittest
+
+
+class NonlinearOscillators(Equation):
+    r"""
+    A set of N nonlinearly coupled oscillators
+    du_i/dt = r * u_i - u_i^3 + u_{i+1} * u_{i-1}
+    with periodic coupling, for testing the FD Jacobian against the analytical one.
+    """
+
+    def __init__(self, N):
+        super().__init__(shape=(N,))
+        self.r = 0.3
+        self.u = np.sin(np.linspace(0, 2*np.pi, N, endpoint=False)) + 0.5
+
+    def rhs(self, u):
+        return self.r * u - u**3 + np.roll(u, -1) * np.roll(u, 1)
+
+    def analytical_jacobian(self, u):
+        N = u.size
+        J = np.diag(self.r - 3 * u**2)
+        i = np.arange(N)
+        J[i, (i+1) % N] += np.roll(u, 1)
+        J[i, (i-1) % N] += np.roll(u, -1)
+        return J
+
+
+class JITNonlinearOscillators(JITEquation, NonlinearOscillators):
+    """The same oscillators, but with a compiled right-hand side kernel"""
+
+    @staticmethod
+    def rhs_kernel(u, r):
+        return r * u - u**3 + np.roll(u, -1) * np.roll(u, 1)
+
+    def kernel_args(self, u):
+        return (self.r,)
+
+    @staticmethod
+    def jacobian_kernel(u, r):
+        N = u.size
+        J = np.diag(r - 3 * u**2)
+        for i in range(N):
+            J[i, (i+1) % N] += u[(i-1) % N]
+            J[i, (i-1) % N] += u[(i+1) % N]
+        return J
+
+
+class TestFiniteDifferenceJacobian(unittest.TestCase):
+    """
+    Test the automatic finite difference Jacobian of the Equation class
+    """
+
+    def setUp(self):
+        self.eq = NonlinearOscillators(N=50)
+
+    def assert_jacobian_close(self, J):
+        if sp.issparse(J):
+            J = J.toarray()
+        J_ref = self.eq.analytical_jacobian(self.eq.u)
+        np.testing.assert_allclose(J, J_ref, atol=1e-5)
+
+    def test_batched_jacobian(self):
+        """the batched FD Jacobian should not depend on the batch size"""
+        for batch_size in [1, 7, 32, 100]:
+            self.eq.jacobian_batch_size = batch_size
+            self.assert_jacobian_close(self.eq.jacobian(self.eq.u))
+
+    def test_central_differences(self):
+        """central differences should give an accurate Jacobian"""
+        self.assert_jacobian_close(self.eq.jacobian(self.eq.u, use_central_differences=True))
+
+    def test_sparse_jacobian(self):
+        """a colored Jacobian with given sparsity pattern should reproduce the dense one"""
+        sparsity = self.eq.analytical_jacobian(self.eq.u) != 0
+        J = self.eq.jacobian(self.eq.u, sparsity=sparsity)
+        self.assertTrue(sp.issparse(J))
+        # the periodic tridiagonal pattern requires only a few colors
+        self.assertLessEqual(self.eq._jacobian_coloring(sparsity).max() + 1, 5)
+        self.assert_jacobian_close(J)
+
+    def test_jit_rhs(self):
+        """the compiled rhs kernel should reproduce the rhs and Jacobian"""
+        eq = JITNonlinearOscillators(N=50)
+        np.testing.assert_allclose(eq.rhs(eq.u), self.eq.rhs(self.eq.u))
+        self.assert_jacobian_close(eq.jacobian(eq.u))
+
+    def test_generated_newton_solver(self):
+        """the compiled Newton iteration should find a root of the kernel"""
+        eq = JITNonlinearOscillators(N=50)
+        solver = NewtonSolver()
+        solve = solver.generate(eq.rhs_kernel, eq.jacobian_kernel)
+        u = solve(eq.u, *eq.kernel_args(eq.u))
+        self.assertLess(np.max(np.abs(eq.rhs(u))), solver.convergence_tolerance)
+        self.assertGreater(solver.niterations, 0)
+
+
+class TestSparseNewtonSolver(unittest.TestCase):
+    """
+    Test the Newton solver with sparse Jacobians, that uses sparse linear solves
+    """
+
+    def test_negative_residuals(self):
+        """residuals that are all negative should not count as converged"""
+        N = 5
+        solver = NewtonSolver()
+        u = solver.solve(lambda u: u - 1, np.zeros(N), lambda u: sp.identity(N, format="csr"))
+        np.testing.assert_allclose(u, np.ones(N))
+        self.assertGreater(solver.niterations, 0)
+
+    def test_nonlinear_oscillators(self):
+        """the sparse path should find a root of a nonlinear system"""
+        eq = NonlinearOscillators(N=50)
+        solver = NewtonSolver()
+        u = solver.solve(eq.rhs, eq.u.copy(), lambda u: sp.csr_matrix(eq.analytical_jacobian(u)))
+        self.assertLess(np.max(np.abs(eq.rhs(u))), solver.convergence_tolerance)
+        self.assertGreater(solver.niterations, 0)
+
+
+# run the test if called directly
+if __name__ == '__main__':
+    unittest.main()
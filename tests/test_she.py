@@ -80,6 +80,26 @@ class TestSwiftHohenbergEquation(unittest.TestCase):
             print(i, self.problem.get_continuation_parameter(), self.problem.norm())
             self.problem.continuation_step()
         print("Parameter continuation finished.")
+        # the stored Jacobian belongs to the accepted solution
+        J = self.problem.continuation_stepper.last_jacobian
+        J_ref = self.problem.jacobian(self.problem.u)
+        self.assertTrue(np.allclose(J.toarray(), J_ref.toarray()))
+
+    def test_BDF2_reused_jacobian(self):
+        """
+        Time stepping with BDF2 and a reused (factorized) Jacobian should give
+        the same solution as with a new Jacobian in every Newton iteration.
+        """
+        solutions = []
+        for max_jacobian_age in (0, 5):
+            problem = Problem()
+            problem.add_equation(SwiftHohenbergEquation(N=128, L=240))
+            problem.time_stepper = time_steppers.BDF2(dt=0.1)
+            problem.time_stepper.max_jacobian_age = max_jacobian_age
+            for _ in range(50):
+                problem.time_step()
+            solutions.append(problem.u)
+        self.assertTrue(np.allclose(solutions[0], solutions[1], atol=1e-4))
 
 
 # run the test if called directly
@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+import os
+import tempfile
+import numpy as np
+from bice import Problem
+from bice.core.equation import Equation
+from bice.core.solution import Solution, Branch, BifurcationDiagram
+import unittest
+
+
+class LinearEquation(Equation):
+    """
+    A trivial equation du/dt = r * u, as a source of problem states for the solutions
+    """
+
+    def __init__(self, N):
+        super().__init__(shape=(N,))
+        self.r = 0.
+        self.u = np.zeros(N)
+
+    def rhs(self, u):
+        return self.r * u
+
+
+class TestBranch(unittest.TestCase):
+    """
+    Test the storage of solutions in branches:
+    - the scalar properties in the branch's arrays and the snapshots of the problem state
+    - the stability and bifurcation detection from the numbers of unstable eigenvalues
+    - saving and loading of branches, incl. lazily created solutions
+    """
+
+    # numbers of unstable (and unstable imaginary) eigenvalues of the test branch
+    nue = [0, 0, 1, 1, None, 3, 3, 2, None, 0]
+    nue_imag = [0, 0, 0, 0, None, 2, 2, 2, None, 0]
+    # the corresponding bifurcation types
+    types = ["", "", "+", "", "", "HP", "", "-", "", "HP"]
+
+    def setUp(self):
+        self.problem = Problem()
+        self.eq = LinearEquation(N=8)
+        self.problem.add_equation(self.eq)
+        self.problem.continuation_parameter = (self.eq, "r")
+        self.branch = Branch()
+        for i, (n, n_imag) in enumerate(zip(self.nue, self.nue_imag)):
+            self.add_solution(0.1 * i, n, n_imag)
+        # temporary files for saving branches
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def add_solution(self, r, n, n_imag):
+        """add a solution with parameter r and the given eigenvalue counts to the branch"""
+        self.eq.r = r
+        self.eq.u = np.linspace(0, r, self.eq.ndofs)
+        solution = Solution(self.problem)
+        solution.set_eigenvalues(n, n_imag)
+        self.branch.add_solution_point(solution)
+        return solution
+
+    def save_and_load(self, branch, **kwargs):
+        """save the branch to a file and load it into a new bifurcation diagram"""
+        filename = os.path.join(self.tmpdir.name, "branch.npz")
+        branch.save(filename, **kwargs)
+        diagram = BifurcationDiagram()
+        diagram.load_branch(filename)
+        return diagram.branches[-1]
+
+    def assertBranchesEqual(self, a, b):
+        """compare the solutions on two branches"""
+        self.assertEqual(len(a.solutions), len(b.solutions))
+        self.assertTrue(np.array_equal(a.parameter_vals(), b.parameter_vals()))
+        self.assertTrue(np.array_equal(a.norm_vals(), b.norm_vals()))
+        self.assertEqual(list(a.bifurcation_types()), list(b.bifurcation_types()))
+        for sol_a, sol_b in zip(a.solutions, b.solutions):
+            self.assertEqual(sol_a.nunstable_eigenvalues, sol_b.nunstable_eigenvalues)
+            self.assertEqual(sol_a.nunstable_imaginary_eigenvalues,
+                             sol_b.nunstable_imaginary_eigenvalues)
+            self.assertTrue(np.allclose(sol_a.data["LinearEquation.u"],
+                                        sol_b.data["LinearEquation.u"]))
+
+    def test_arrays(self):
+        """the scalar properties are stored in the (growing) arrays of the branch"""
+        for i in range(len(self.nue), 40):
+            self.add_solution(0.1 * i, None, None)
+        solutions = self.branch.solutions
+        self.assertEqual(len(solutions), 40)
+        self.assertTrue(np.allclose(self.branch.parameter_vals(), 0.1 * np.arange(40)))
+        self.assertTrue(np.allclose(self.branch.norm_vals(), [s.norm for s in solutions]))
+        for i, solution in enumerate(solutions):
+            self.assertIs(solution.branch, self.branch)
+            self.assertEqual(solutions.index(solution), i)
+            self.assertEqual(solution.nunstable_eigenvalues, (self.nue + [None] * 40)[i])
+        # changing a property of the solution changes the branch's arrays
+        solutions[3].p = 42.
+        self.assertEqual(self.branch.parameter_vals()[3], 42.)
+
+    def test_snapshots(self):
+        """the problem states are kept in the separate list of snapshots of the branch"""
+        for i, solution in enumerate(self.branch.solutions):
+            self.assertIs(solution.data, self.branch._snapshots[i])
+            self.assertTrue(np.allclose(solution.data["LinearEquation.u"],
+                                        np.linspace(0, 0.1 * i, self.eq.ndofs)))
+        # a problem can be restored from the solution
+        self.problem.load(self.branch.solutions[4])
+        self.assertAlmostEqual(self.eq.r, 0.4)
+        self.assertTrue(np.allclose(self.eq.u, np.linspace(0, 0.4, self.eq.ndofs)))
+
+    def test_known_eigenvalues(self):
+        """the sorted lists of indices of the solutions with known eigenvalues"""
+        known = [i for i, n in enumerate(self.nue) if n is not None]
+        self.assertEqual(self.branch._known["_nue"], known)
+        # setting and unsetting counts keeps the lists sorted
+        self.branch.solutions[4].nunstable_eigenvalues = 1
+        self.branch.solutions[0].nunstable_eigenvalues = None
+        self.assertEqual(self.branch._known["_nue"], sorted(set(known) - {0} | {4}))
+        self.assertIsNone(self.branch.solutions[1].neigenvalues_crossed)
+        self.assertEqual(self.branch.solutions[5].neigenvalues_crossed, 2)
+
+    def test_bifurcations(self):
+        """bifurcation types of the single solutions and of the whole branch"""
+        solutions = self.branch.solutions
+        self.assertEqual([s.bifurcation_type() for s in solutions], self.types)
+        self.assertEqual(list(self.branch.bifurcation_types()), self.types)
+        bifurcations = [i for i, t in enumerate(self.types) if t != ""]
+        self.assertEqual([solutions.index(s) for s in self.branch.bifurcations()], bifurcations)
+        self.assertEqual([s.is_bifurcation() for s in solutions], [t != "" for t in self.types])
+        self.assertEqual([s.is_stable() for s in solutions],
+                         [None if n is None else n == 0 for n in self.nue])
+
+    def test_masks(self):
+        """the masks of the stable/unstable parts and the bifurcations of the branch"""
+        nue = np.array([-1 if n is None else n for n in self.nue])
+        p, _ = self.branch.data(only="stable")
+        self.assertTrue(np.array_equal(p.mask, nue != 0))
+        p, _ = self.branch.data(only="unstable")
+        self.assertTrue(np.array_equal(p.mask, nue == 0))
+        p, _ = self.branch.data(only="bifurcations")
+        self.assertTrue(np.array_equal(p.mask, np.array(self.types) == ""))
+        p, norm = self.branch.data()
+        self.assertFalse(np.any(np.ma.getmaskarray(p)))
+        self.assertTrue(np.array_equal(p, self.branch.parameter_vals()))
+
+    def test_remove_solution(self):
+        """removing a solution moves its data back to the solution"""
+        solutions = self.branch.solutions
+        removed = solutions[5]
+        following = solutions[6]
+        self.branch.remove_solution_point(removed)
+        self.assertIsNone(removed.branch)
+        self.assertEqual(removed.nunstable_eigenvalues, 3)
+        self.assertAlmostEqual(removed.p, 0.5)
+        self.assertTrue(np.allclose(removed.data["LinearEquation.u"],
+                                    np.linspace(0, 0.5, self.eq.ndofs)))
+        self.assertEqual(len(solutions), len(self.nue) - 1)
+        self.assertEqual(solutions.index(following), 5)
+        self.assertEqual(self.branch._known["_nue"], [0, 1, 2, 3, 5, 6, 8])
+        # the crossings are now counted w.r.t. the solution before the removed one
+        self.assertEqual(following.neigenvalues_crossed, 2)
+        self.assertEqual(following.bifurcation_type(update=True), "HP")
+
+    def test_save_load(self):
+        """round trip of saving and loading a branch"""
+        loaded = self.save_and_load(self.branch)
+        self.assertBranchesEqual(self.branch, loaded)
+        # the compressed file stores the eigenvalue counts as int16
+        filename = os.path.join(self.tmpdir.name, "branch.npz")
+        with np.load(filename, allow_pickle=True) as data:
+            self.assertEqual(data["nunstable_eigenvalues"].dtype, np.int16)
+            self.assertEqual(data["nunstable_imaginary_eigenvalues"].dtype, np.int16)
+        # also after removing a solution
+        self.branch.remove_solution_point(self.branch.solutions[2])
+        self.assertBranchesEqual(self.branch, self.save_and_load(self.branch))
+        # also with reduced precision of the snapshots
+        loaded = self.save_and_load(self.branch, dtype=np.float32)
+        self.assertBranchesEqual(self.branch, loaded)
+        self.assertEqual(loaded.solutions[3].data["LinearEquation.u"].dtype, np.float32)
+
+    def test_lazy_solutions(self):
+        """the solutions of a loaded branch are created on first access"""
+        loaded = self.save_and_load(self.branch)
+        solutions = loaded.solutions
+        # accessing the solutions in any order yields IDs in the order of the branch
+        last = solutions[-1]
+        first = solutions[0]
+        ids = [s.id for s in solutions]
+        self.assertEqual(ids, list(range(first.id, last.id + 1)))
+        # new solutions get new IDs
+        self.assertGreater(Solution().id, last.id)
+        # each index always refers to the same object
+        self.assertIs(solutions[0], first)
+        self.assertIs(solutions[-1], last)
+        for i, solution in enumerate(solutions):
+            self.assertIs(solution.branch, loaded)
+            self.assertEqual(solutions.index(solution), i)
+        # removing a solution of a loaded branch
+        loaded.remove_solution_point(solutions[1])
+        self.assertEqual(solutions.index(solutions[1]), 1)
+        self.assertEqual([s.id for s in solutions], ids[:1] + ids[2:])
+
+    def test_load_legacy_counts(self):
+        """older files store unknown numbers of eigenvalues as None"""
+        filename = os.path.join(self.tmpdir.name, "legacy.npz")
+        n = len(self.nue)
+        np.savez(filename,
+                 solution_data=np.array(self.branch._snapshots, dtype=object),
+                 norm=self.branch.norm_vals(), p=self.branch.parameter_vals(),
+                 nunstable_eigenvalues=np.array(self.nue, dtype=object),
+                 nunstable_imaginary_eigenvalues=np.array(self.nue_imag, dtype=object))
+        diagram = BifurcationDiagram()
+        diagram.load_branch(filename)
+        loaded = diagram.branches[-1]
+        self.assertEqual(len(loaded.solutions), n)
+        self.assertEqual([s.nunstable_eigenvalues for s in loaded.solutions], self.nue)
+        self.assertEqual(list(loaded.bifurcation_types()), self.types)
+
+
+# run the test if called directly
+if __name__ == '__main__':
+    unittest.main()
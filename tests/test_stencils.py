@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+import numpy as np
+from unittest import mock
+from bice.core.jit import HAS_NUMBA
+from bice.pde import _stencils
+from bice.pde._stencils import apply_periodic_stencil, central_stencil, periodic_stencil_matrix
+from bice.pde.finite_differences import FiniteDifferencesEquation, PeriodicBC
+import unittest
+
+
+class PeriodicEquation(FiniteDifferencesEquation):
+    """
+    A trivial FD equation du/dt = du/dx on a periodic grid, for testing the derivatives
+    """
+
+    def __init__(self, x):
+        super().__init__()
+        self.x = [x]
+        self.u = np.sin(2 * np.pi * x / 10) + 0.3 * np.cos(6 * np.pi * x / 10)
+        self.bc = PeriodicBC()
+
+    def rhs(self, u):
+        return self.du_dx(u)
+
+
+class TestPeriodicStencils(unittest.TestCase):
+    """
+    Test the application of periodic stencils against the product with the stencil matrix,
+    for the compiled kernels (if numba is available) and the NumPy fallback
+    """
+
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+
+    def check_stencils(self):
+        """compare apply_periodic_stencil with the matrix product for different inputs"""
+        N = 37
+        for derivative, order in [(1, 8), (2, 8), (1, 2), (4, 4)]:
+            offsets, coeffs = central_stencil(derivative, order)
+            A = periodic_stencil_matrix(coeffs, offsets, N)
+            inputs = [
+                # real 1d vectors
+                self.rng.standard_normal(N),
+                # complex vectors
+                self.rng.standard_normal(N) + 1j * self.rng.standard_normal(N),
+                # batches of vectors along the trailing dimensions
+                self.rng.standard_normal((N, 3)),
+                self.rng.standard_normal((N, 2, 2)),
+            ]
+            for u in inputs:
+                expected = A.dot(u.reshape((N, -1))).reshape(u.shape)
+                self.assertTrue(np.allclose(apply_periodic_stencil(u, coeffs, offsets), expected))
+                # with a preallocated output array
+                out = np.empty(u.shape, dtype=expected.dtype)
+                result = apply_periodic_stencil(u, coeffs, offsets, out=out)
+                self.assertIs(result, out)
+                self.assertTrue(np.allclose(out, expected))
+        # stencils that are wider than the domain wrap around several times
+        offsets, coeffs = central_stencil(2, 8)
+        u = self.rng.standard_normal(3)
+        A = periodic_stencil_matrix(coeffs, offsets, 3)
+        self.assertTrue(np.allclose(apply_periodic_stencil(u, coeffs, offsets), A.dot(u)))
+
+    @unittest.skipUnless(HAS_NUMBA, "requires numba")
+    def test_numba_kernels(self):
+        """the compiled 1d and general kernels"""
+        self.check_stencils()
+
+    def test_numpy_fallback(self):
+        """the NumPy implementation, used if numba is not available"""
+        with mock.patch.object(_stencils, "HAS_NUMBA", False):
+            self.check_stencils()
+
+
+class TestFFTDerivative(unittest.TestCase):
+    """
+    Test the FFT-based derivative of FiniteDifferencesEquation against the FD nabla operator
+    """
+
+    def test_uniform_grid(self):
+        """FFT derivative on a uniform periodic grid"""
+        for N in [64, 65]:
+            eq = PeriodicEquation(np.linspace(-5, 5, N, endpoint=False))
+            eq.build_FD_matrices()
+            expected = eq.nabla(eq.u)
+            eq.use_fft = True
+            eq.build_FD_matrices()
+            self.assertIsNotNone(eq._nabla_hat)
+            self.assertTrue(np.allclose(eq.du_dx(eq.u), expected))
+            out = np.empty(N)
+            self.assertIs(eq.du_dx(eq.u, out=out), out)
+            self.assertTrue(np.allclose(out, expected))
+
+    def test_nonuniform_grid(self):
+        """non-uniform grids fall back to the FD operator"""
+        x = np.linspace(-5, 5, 64, endpoint=False)
+        x[10] += 0.05
+        eq = PeriodicEquation(x)
+        eq.use_fft = True
+        eq.build_FD_matrices()
+        self.assertIsNone(eq._nabla_hat)
+        self.assertTrue(np.allclose(eq.du_dx(eq.u), eq.nabla(eq.u)))
+
+
+# run the test if called directly
+if __name__ == '__main__':
+    unittest.main()